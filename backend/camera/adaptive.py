@@ -0,0 +1,226 @@
+"""
+Adaptive Quality Control
+Closed-loop controller that steps the processing resolution and target
+analysis rate down when per-frame latency or CPU headroom breaks the budget,
+and back up once there is comfortable slack. Every change is recorded
+"""
+
+import os
+import time
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """Processing width (height follows the frame's aspect ratio) and analysis rate"""
+    width: int
+    fps: float
+
+    def __str__(self):
+        return f"{self.width}px @ {self.fps:g} FPS"
+
+@dataclass
+class QualityChange:
+    """One step of the controller"""
+    timestamp: float        # wall-clock time of the change
+    level: int              # index into the ladder, 0 = best
+    width: int
+    fps: float
+    reason: str
+    p95_ms: float           # latency that triggered the change
+    cpu: float              # busy share of the machine's CPUs at that time
+
+    def to_dict(self):
+        """Plain dict representation for logging or serialization"""
+        return asdict(self)
+
+class CpuLoad:
+    """Busy share of the machine's CPUs between two samples
+
+    Linux reads the system-wide counters in /proc/stat and other Unixes the
+    1-minute load average per core, so load from other processes counts.
+    Without either (Windows) the process's CPU time is taken as a share of
+    one core, which is all the analysis loop can use.
+    """
+    def __init__(self, proc_stat="/proc/stat"):
+        self.proc_stat = proc_stat
+        self.cpu_count = os.cpu_count() or 1
+        try:
+            self.read_proc_stat()
+            self.source = "proc_stat"
+        except (OSError, ValueError):
+            self.source = "loadavg" if hasattr(os, "getloadavg") else "process"
+        self.last = self.counters()
+
+    def read_proc_stat(self):
+        """(busy, total) jiffies summed over all CPUs"""
+        with open(self.proc_stat) as f:
+            fields = f.readline().split()
+        if fields[0] != "cpu":
+            raise ValueError(f"Unexpected {self.proc_stat} format")
+
+        # user nice system idle iowait irq softirq steal (guest time is already in user)
+        ticks = [int(value) for value in fields[1:9]]
+        idle = ticks[3] + ticks[4]
+        return sum(ticks) - idle, sum(ticks)
+
+    def counters(self):
+        """(busy, total) since some fixed point, in any unit"""
+        if self.source == "proc_stat":
+            return self.read_proc_stat()
+        if self.source == "process":
+            return time.process_time(), time.perf_counter()
+        return 0.0, 0.0
+
+    def sample(self):
+        """Busy share (0 to 1) since the previous sample"""
+        if self.source == "loadavg":
+            return min(os.getloadavg()[0] / self.cpu_count, 1.0)
+
+        busy, total = self.counters()
+        last_busy, last_total = self.last
+        self.last = (busy, total)
+        if total <= last_total:
+            return 0.0
+        return min(max((busy - last_busy) / (total - last_total), 0.0), 1.0)
+
+class AdaptiveQualityController:
+    """Holds a latency budget by trading resolution and analysis rate
+
+    Levels are tried best-first. A level is too expensive when the p95
+    capture-to-decision latency exceeds the budget or the level's frame
+    interval, or when CPU headroom runs out. Stepping back up needs a clear
+    margin on both for several evaluations in a row, so the controller
+    doesn't oscillate around a threshold.
+    """
+    LEVELS = (
+        QualityLevel(640, 30), QualityLevel(640, 20), QualityLevel(480, 20),
+        QualityLevel(480, 15), QualityLevel(320, 15), QualityLevel(320, 10),
+    )
+
+    def __init__(self, latency_budget=0.1, levels=None, evaluate_interval=1.0, min_headroom=0.15,
+                 upgrade_ratio=0.6, upgrade_headroom=0.35, down_after=2, up_after=5, start_level=0):
+        self.levels = tuple(levels or self.LEVELS)
+        self.latency_budget = latency_budget
+        self.evaluate_interval = evaluate_interval
+
+        # Hysteresis: downgrade past the budget, upgrade only well inside it
+        self.min_headroom = min_headroom
+        self.upgrade_ratio = upgrade_ratio
+        self.upgrade_headroom = upgrade_headroom
+        self.down_after = down_after
+        self.up_after = up_after
+        self.over_count = 0
+        self.under_count = 0
+
+        self.level_index = start_level
+        self.next_due = 0.0
+        self.latencies = []
+        self.window_start = None
+        self.level_start = None
+        self.cpu_load = CpuLoad()
+
+        self.subscribers = []
+
+        # Statistics
+        self.changes = []
+        self.seconds_at_level = [0.0] * len(self.levels)
+        self.skipped_frames = 0
+        self.last_p95 = 0.0
+        self.last_cpu = 0.0
+
+    @property
+    def level(self):
+        """Current QualityLevel"""
+        return self.levels[self.level_index]
+
+    def subscribe(self, callback):
+        """Call callback(QualityChange) on every level change"""
+        self.subscribers.append(callback)
+
+    def due(self, now):
+        """Whether a frame arriving now should be analyzed at the target rate"""
+        interval = 1.0 / self.level.fps
+
+        # A quarter interval of slack keeps camera jitter from rounding the rate down
+        slack = interval / 4
+        if now < self.next_due - slack:
+            self.skipped_frames += 1
+            return False
+        self.next_due = max(self.next_due, now - slack) + interval
+        return True
+
+    def processing_size(self, frame_shape):
+        """(width, height) to resize to, or None when the frame is small enough"""
+        height, width = frame_shape[:2]
+        target = self.level.width
+        if width <= target:
+            return None
+        return target, int(round(height * target / width / 2)) * 2
+
+    def observe(self, now, latency):
+        """Add one analyzed frame's capture-to-decision latency"""
+        if self.window_start is None:
+            self.window_start = self.level_start = now
+            self.cpu_load.sample()
+        self.latencies.append(latency)
+        if now - self.window_start >= self.evaluate_interval:
+            self.evaluate(now)
+
+    def evaluate(self, now):
+        """Close the measurement window and step the level if warranted"""
+        cpu = self.cpu_load.sample()
+        p95 = float(np.percentile(self.latencies, 95)) if self.latencies else 0.0
+        self.latencies = []
+        self.window_start = now
+        self.last_p95 = p95
+        self.last_cpu = cpu
+
+        headroom = 1.0 - cpu
+        limit = min(self.latency_budget, 1.0 / self.level.fps)
+        if p95 > limit or headroom < self.min_headroom:
+            self.over_count += 1
+            self.under_count = 0
+        elif self.level_index > 0:
+            # The better level must fit with room to spare
+            better = self.levels[self.level_index - 1]
+            upgrade_limit = self.upgrade_ratio * min(self.latency_budget, 1.0 / better.fps)
+            if p95 < upgrade_limit and headroom > self.upgrade_headroom:
+                self.under_count += 1
+            else:
+                self.under_count = 0
+            self.over_count = 0
+        else:
+            self.over_count = self.under_count = 0
+
+        if self.over_count >= self.down_after and self.level_index < len(self.levels) - 1:
+            if p95 > limit:
+                reason = f"p95 {p95 * 1000:.0f} ms over {limit * 1000:.0f} ms"
+            else:
+                reason = f"CPU headroom {headroom * 100:.0f}%"
+            self.change(now, self.level_index + 1, reason, p95, cpu)
+        elif self.under_count >= self.up_after:
+            self.change(now, self.level_index - 1, f"p95 {p95 * 1000:.0f} ms, CPU headroom {headroom * 100:.0f}%",
+                        p95, cpu)
+
+    def change(self, now, level_index, reason, p95, cpu):
+        """Switch levels, account the time spent and notify subscribers"""
+        self.seconds_at_level[self.level_index] += now - self.level_start
+        self.level_start = now
+        self.level_index = level_index
+        self.over_count = self.under_count = 0
+
+        level = self.level
+        event = QualityChange(time.time(), level_index, level.width, level.fps, reason,
+                              round(p95 * 1000, 1), round(cpu, 3))
+        self.changes.append(event)
+        for callback in self.subscribers:
+            callback(event)
+
+    def time_at_levels(self, now):
+        """Seconds spent at each level so far, including the current one"""
+        seconds = list(self.seconds_at_level)
+        if self.level_start is not None:
+            seconds[self.level_index] += now - self.level_start
+        return seconds
@@ -4,30 +4,186 @@ Advanced Face Detection & Eye Tracking System for Terminal
 High-accuracy monitoring for online test environments using MediaPipe
 """
 
+# Startup timing begins before the heavy imports
+import time
+STARTUP_ORIGIN = time.perf_counter()
+
 import cv2
 import numpy as np
-import mediapipe as mp
-import math
-import time
+import argparse
 import threading
-from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional
+from pose import HeadPoseEstimator, SOLVERS
+from metrics import StageMetrics, MetricsServer, StartupTimer
+from buffers import FrameBufferPool
+from stability import StabilityTracker
 import warnings
 warnings.filterwarnings("ignore")
 
+@dataclass
+class DetectionResult:
+    """Structured per-frame verdict returned by headless analysis"""
+    face_detected: bool = False
+    eyes_detected: bool = False
+    head_pose_valid: bool = False
+    looking_at_camera: bool = False
+    is_valid: bool = False
+    
+    # Eye openness and iris position
+    left_ear: Optional[float] = None
+    right_ear: Optional[float] = None
+    avg_ear: Optional[float] = None
+    left_iris_x: Optional[float] = None
+    left_iris_y: Optional[float] = None
+    right_iris_x: Optional[float] = None
+    right_iris_y: Optional[float] = None
+    
+    # Head pose in degrees
+    pitch: Optional[float] = None
+    yaw: Optional[float] = None
+    roll: Optional[float] = None
+    
+    # Smoothed stability scores
+    face_stability: float = 0.0
+    eye_stability: float = 0.0
+    pose_stability: float = 0.0
+    gaze_stability: float = 0.0
+    
+    # FaceLandmarker blendshape scores by name (only when enabled)
+    blendshapes: Optional[dict] = None
+    
+    def to_dict(self):
+        """Plain dict representation for logging or serialization"""
+        return asdict(self)
+
+class LatestFrameReader:
+    """Background capture thread that only keeps the newest frame"""
+    def __init__(self, cap):
+        self.cap = cap
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        
+        # Latest frame slot (older unread frames are overwritten)
+        self.frame = None
+        self.capture_time = 0.0
+        self.frame_id = 0
+        self.consumed_id = 0
+        self.ended = False
+        
+        # Statistics
+        self.captured_frames = 0
+        self.dropped_frames = 0
+    
+    def start(self):
+        """Start the reader thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._reader_loop, name="frame-reader", daemon=True)
+        self.thread.start()
+        return self
+    
+    def _reader_loop(self):
+        """Continuously drain the camera so the driver queue never fills up"""
+        while self.running:
+            ret, frame = self.cap.read()
+            capture_time = time.perf_counter()
+            with self.condition:
+                if not ret:
+                    self.ended = True
+                    self.condition.notify_all()
+                    break
+                
+                # The previous frame was never picked up by the analysis loop
+                if self.frame_id > self.consumed_id:
+                    self.dropped_frames += 1
+                
+                self.frame = frame
+                self.capture_time = capture_time
+                self.frame_id += 1
+                self.captured_frames += 1
+                self.condition.notify_all()
+    
+    def read(self, timeout=None):
+        """Wait for a frame newer than the last one returned"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.frame_id > self.consumed_id or self.ended or not self.running,
+                timeout=timeout
+            )
+            if self.frame_id <= self.consumed_id:
+                return False, None, 0.0
+            
+            self.consumed_id = self.frame_id
+            return True, self.frame, self.capture_time
+    
+    def stop(self):
+        """Stop the reader thread"""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+def create_face_mesh(static_image_mode=False):
+    """Create a MediaPipe Face Mesh with the detector's accuracy settings"""
+    # MediaPipe is the slowest import; processes that never run a model skip it
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.7
+    )
+
 class AdvancedFaceDetector:
-    def __init__(self):
-        # Initialize MediaPipe
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        
-        # Face mesh for high accuracy detection
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        )
+    def __init__(self, headless=False, face_mesh=None, keyframe_scheduler=None, roi_cropper=None,
+                 pose_estimator=None, landmark_engine=None, load_models=True):
+        # Headless mode skips all drawing, overlay and window work
+        self.headless = headless
+        
+        # Without models this is a capture/display front end for analysis done elsewhere
+        self.load_models = load_models
+        
+        # Optional FaceLandmarker engine replacing the legacy Face Mesh solution
+        self.landmark_engine = landmark_engine
+        self.transformation_matrix = None
+        self.blendshapes = None
+        self.frame_timestamp = None
+        
+        # Optional scheduler that skips inference on stable frames
+        self.keyframe_scheduler = keyframe_scheduler
+        
+        # Optional cropper that runs inference on the face region only
+        self.roi_cropper = roi_cropper
+        self.analysis_shape = None
+        
+        # Crops get their own mesh so neither instance's internal tracking
+        # mixes crop and full-frame coordinates
+        self.roi_face_mesh = None
+        if roi_cropper is not None and landmark_engine is None and load_models:
+            self.roi_face_mesh = create_face_mesh()
+        
+        # Head pose solver with cached intrinsics and warm-started solves
+        self.pose_estimator = pose_estimator or HeadPoseEstimator()
+        
+        # Rolling per-stage latency percentiles
+        self.metrics = StageMetrics()
+        self.metrics_server = None
+        
+        # Reusable destinations for flip, color conversion and capture
+        self.buffers = FrameBufferPool()
+        self.capture_frame = None
+        self.gray_parity = 0
+        
+        # MediaPipe drawing helpers, loaded on the first mesh drawn
+        self.mp_face_mesh = None
+        self.mp_drawing = None
+        self.mp_drawing_styles = None
+        
+        # Face mesh for high accuracy detection (may be shared by a worker process)
+        self.face_mesh = face_mesh or (create_face_mesh() if landmark_engine is None and load_models else None)
         
         # Camera and detection parameters
         self.cap = None
@@ -40,18 +196,23 @@ class AdvancedFaceDetector:
         self.looking_at_camera = False
         self.head_pose_valid = False
         self.eye_landmarks = None
+        self.face_landmarks = None
+        self.last_result = DetectionResult()
+        self.left_iris_ratio = (None, None)
+        self.right_iris_ratio = (None, None)
+        
+        self.gaze_sample = None
         
-        # Accuracy buffers for smoothing
-        self.eye_track_buffer = deque(maxlen=15)
-        self.face_track_buffer = deque(maxlen=10)
-        self.pose_buffer = deque(maxlen=12)
-        self.gaze_buffer = deque(maxlen=20)
+        # Time-windowed smoothing, verdict hysteresis and violation events
+        self.stability = StabilityTracker(alert_threshold=3)  # seconds before alert
         
         # Thresholds for high accuracy
         self.EYE_ASPECT_RATIO_THRESHOLD = 0.22
         self.GAZE_THRESHOLD = 0.04  # More sensitive threshold
         self.HEAD_POSE_THRESHOLD = 15  # degrees
         self.IRIS_THRESHOLD = 0.03  # Iris position threshold
+        self.IRIS_WINDOW = (0.4, 0.6)  # Iris ratios counted as centered
+        self.GAZE_SCORE_THRESHOLD = 0.8  # Gaze score counted as on-screen by the smoothing
         
         # Eye landmark indices for MediaPipe
         self.LEFT_EYE_INDICES = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
@@ -59,12 +220,76 @@ class AdvancedFaceDetector:
         self.LEFT_IRIS_INDICES = [468, 469, 470, 471, 472]
         self.RIGHT_IRIS_INDICES = [473, 474, 475, 476, 477]
         
+        # Precomputed index arrays for vectorized landmark math
+        self.EAR_INDEX_ARRAY = np.array([self.LEFT_EYE_INDICES[:6], self.RIGHT_EYE_INDICES[:6]])
+        self.IRIS_INDEX_ARRAY = np.array([self.LEFT_IRIS_INDICES, self.RIGHT_IRIS_INDICES])
+        self.IRIS_CORNER_INDEX_ARRAY = np.array([
+            [eye[0], eye[8], eye[4], eye[12]]
+            for eye in (self.LEFT_EYE_INDICES, self.RIGHT_EYE_INDICES)
+        ])
+        self.POSE_INDEX_ARRAY = np.array([1, 18, 33, 263, 61, 291])
+        
+        # Per eye: iris points, then the corners (left, right, top, bottom)
+        self.IRIS_ROW_ARRAY = np.concatenate([self.IRIS_INDEX_ARRAY, self.IRIS_CORNER_INDEX_ARRAY], axis=1)
+        
+        # Every landmark the per-frame math reads; the rest are only converted on demand
+        self.ANALYSIS_INDEX_ARRAY = np.unique(np.concatenate([
+            self.EAR_INDEX_ARRAY.ravel(), self.IRIS_ROW_ARRAY.ravel(), self.POSE_INDEX_ARRAY
+        ]))
+        self.analysis_indices = self.ANALYSIS_INDEX_ARRAY.tolist()
+        
+        # The keyframe tracker follows exactly the landmarks the math above uses
+        if self.keyframe_scheduler is not None and self.keyframe_scheduler.tracked_indices is None:
+            self.keyframe_scheduler.tracked_indices = np.unique(np.concatenate([
+                self.LEFT_EYE_INDICES, self.RIGHT_EYE_INDICES,
+                self.LEFT_IRIS_INDICES, self.RIGHT_IRIS_INDICES,
+                self.POSE_INDEX_ARRAY
+            ]))
+        
         # Statistics
         self.total_frames = 0
         self.valid_frames = 0
         self.start_time = time.time()
-        self.alert_threshold = 3  # seconds before alert
-        self.last_valid_time = time.time()
+        
+        # Capture pipeline statistics
+        self.frame_reader = None
+        self.dropped_frames = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latency_samples = 0
+        
+        # Per-phase startup timing, reported with the first verdict
+        self.startup = None
+        
+        # Structured verdict stream for the backend (replaces the status line)
+        self.streamer = None
+        
+        # Violation clip recorder fed from the main loop
+        self.evidence = None
+        
+        # Adaptive resolution / analysis-rate controller (in-process analysis only)
+        self.quality = None
+        
+        # Background check for more than one person in view
+        self.multi_face = None
+        
+        # Memory-mapped per-frame measurement log for post-exam queries
+        self.telemetry = None
+        
+        # Raw landmark recording for offline re-scoring, and the 'c' key's calibration
+        self.landmark_cache = None
+        self.calibrator = None
+        
+        # Shared-memory transport to analysis processes (multi-process mode)
+        self.transport = None
+        self.held_slot = None
+        
+        # Verdicts that came back ahead of an earlier frame, by frame id; a
+        # frame still missing this long after a later one was captured is lost
+        self.reorder_buffer = {}
+        self.next_verdict_id = 0
+        self.reorder_timeout = 1.0  # seconds
         
     def initialize_camera(self, camera_id=0):
         """Initialize camera with optimal settings"""
@@ -84,272 +309,514 @@ class AdvancedFaceDetector:
         print("✓ MediaPipe Face Mesh loaded")
         return True
     
+    def landmarks_to_array(self, landmarks):
+        """Convert a face mesh landmark list into a contiguous (N, 3) float32 array"""
+        if isinstance(landmarks, np.ndarray):
+            return landmarks
+        
+        points = landmarks.landmark
+        coords = np.fromiter(
+            (value for point in points for value in (point.x, point.y, point.z)),
+            dtype=np.float32, count=len(points) * 3
+        )
+        return coords.reshape(-1, 3)
+    
+    def gather_landmarks(self, landmarks):
+        """Convert only the analysis landmarks into a full-length (N, 3) float32 array
+        
+        Rows outside ANALYSIS_INDEX_ARRAY are NaN. Reading ~30 protobuf
+        landmarks instead of all 478 is most of the per-frame conversion cost.
+        """
+        points = landmarks.landmark
+        gathered = np.full((len(points), 3), np.nan, dtype=np.float32)
+        gathered[self.ANALYSIS_INDEX_ARRAY] = np.fromiter(
+            (value for index in self.analysis_indices for point in (points[index],)
+             for value in (point.x, point.y, point.z)),
+            dtype=np.float32, count=len(self.analysis_indices) * 3
+        ).reshape(-1, 3)
+        return gathered
+    
+    @property
+    def needs_full_landmarks(self):
+        """Whether anything this frame reads landmarks beyond the analysis set
+        
+        The keyframe tracker and ROI crop follow the whole mesh, the landmark
+        cache and calibrator store it. Drawing a full-frame result uses the
+        landmark list itself.
+        """
+        return (self.keyframe_scheduler is not None or self.roi_cropper is not None
+                or self.landmark_cache is not None or self.calibrator is not None)
+    
     def calculate_eye_aspect_ratio(self, eye_landmarks):
         """Calculate Eye Aspect Ratio (EAR) for blink detection"""
         if len(eye_landmarks) < 6:
             return 0
         
-        # Calculate vertical distances
-        vertical_1 = math.dist(eye_landmarks[1], eye_landmarks[5])
-        vertical_2 = math.dist(eye_landmarks[2], eye_landmarks[4])
+        eye = np.asarray(eye_landmarks, dtype=np.float32)
         
-        # Calculate horizontal distance
-        horizontal = math.dist(eye_landmarks[0], eye_landmarks[3])
+        # Vertical distances (1-5, 2-4) and horizontal distance (0-3)
+        vertical = np.linalg.norm(eye[[1, 2]] - eye[[5, 4]], axis=-1)
+        horizontal = np.linalg.norm(eye[0] - eye[3])
         
         # EAR formula
-        ear = (vertical_1 + vertical_2) / (2.0 * horizontal)
-        return ear
+        ear = vertical.sum() / (2.0 * horizontal)
+        return float(ear)
+    
+    def calculate_eye_aspect_ratios(self, points):
+        """Calculate EAR for both eyes at once from a landmark array"""
+        # (2 eyes, 6 points, xy)
+        eyes = points[self.EAR_INDEX_ARRAY, :2]
+        
+        vertical = np.linalg.norm(eyes[:, [1, 2]] - eyes[:, [5, 4]], axis=-1).sum(axis=1)
+        horizontal = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=-1)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ears = vertical / (2.0 * horizontal)
+        return float(ears[0]), float(ears[1])
     
     def get_eye_landmarks(self, landmarks, eye_indices):
         """Extract eye landmarks from face mesh"""
-        eye_points = []
-        for idx in eye_indices[:6]:  # Get first 6 points for EAR calculation
-            point = landmarks.landmark[idx]
-            eye_points.append([point.x, point.y])
-        return eye_points
+        points = self.landmarks_to_array(landmarks)
+        # Get first 6 points for EAR calculation
+        return points[np.asarray(eye_indices[:6]), :2]
     
     def calculate_iris_position(self, landmarks, iris_indices, eye_indices):
         """Calculate iris position relative to eye corners"""
         if not iris_indices or not eye_indices:
             return 0.5, 0.5  # Center position
         
-        # Get iris center
-        iris_points = []
-        for idx in iris_indices:
-            point = landmarks.landmark[idx]
-            iris_points.append([point.x, point.y])
-        
-        if not iris_points:
-            return 0.5, 0.5
-        
-        iris_center = np.mean(iris_points, axis=0)
+        points = self.landmarks_to_array(landmarks)
+        iris_center = points[np.asarray(iris_indices), :2].mean(axis=0)
         
         # Get eye corners
-        left_corner = landmarks.landmark[eye_indices[0]]
-        right_corner = landmarks.landmark[eye_indices[8] if len(eye_indices) > 8 else eye_indices[-1]]
-        top_point = landmarks.landmark[eye_indices[4] if len(eye_indices) > 4 else eye_indices[1]]
-        bottom_point = landmarks.landmark[eye_indices[12] if len(eye_indices) > 12 else eye_indices[2]]
+        left_corner = points[eye_indices[0]]
+        right_corner = points[eye_indices[8] if len(eye_indices) > 8 else eye_indices[-1]]
+        top_point = points[eye_indices[4] if len(eye_indices) > 4 else eye_indices[1]]
+        bottom_point = points[eye_indices[12] if len(eye_indices) > 12 else eye_indices[2]]
         
         # Calculate relative position
-        eye_width = abs(right_corner.x - left_corner.x)
-        eye_height = abs(top_point.y - bottom_point.y)
+        eye_width = abs(right_corner[0] - left_corner[0])
+        eye_height = abs(top_point[1] - bottom_point[1])
         
         if eye_width > 0:
-            iris_x_ratio = (iris_center[0] - left_corner.x) / eye_width
+            iris_x_ratio = (iris_center[0] - left_corner[0]) / eye_width
         else:
             iris_x_ratio = 0.5
             
         if eye_height > 0:
-            iris_y_ratio = (iris_center[1] - bottom_point.y) / eye_height
+            iris_y_ratio = (iris_center[1] - bottom_point[1]) / eye_height
         else:
             iris_y_ratio = 0.5
         
-        return iris_x_ratio, iris_y_ratio
+        return float(iris_x_ratio), float(iris_y_ratio)
+    
+    def calculate_iris_positions(self, points):
+        """Calculate (x, y) iris ratios for both eyes at once, [left, right]"""
+        # 18 values: one gather, then plain floats beat small-array numpy calls
+        iris_count = self.IRIS_INDEX_ARRAY.shape[1]
+        ratios = []
+        for eye in points[self.IRIS_ROW_ARRAY, :2].tolist():
+            iris, corners = eye[:iris_count], eye[iris_count:]
+            center_x = sum(point[0] for point in iris) / iris_count
+            center_y = sum(point[1] for point in iris) / iris_count
+            
+            # Corners in order: left, right, top, bottom
+            (left_x, _), (right_x, _), (_, top_y), (_, bottom_y) = corners
+            eye_width = abs(right_x - left_x)
+            eye_height = abs(top_y - bottom_y)
+            
+            # Degenerate eyes fall back to the center position
+            ratios.append((
+                (center_x - left_x) / eye_width if eye_width > 0 else 0.5,
+                (center_y - bottom_y) / eye_height if eye_height > 0 else 0.5
+            ))
+        return ratios
     
     def estimate_head_pose(self, landmarks, frame_shape):
         """Estimate head pose using facial landmarks"""
-        # Key facial points for pose estimation
-        nose_tip = landmarks.landmark[1]
-        nose_bridge = landmarks.landmark[6]
-        left_eye = landmarks.landmark[33]
-        right_eye = landmarks.landmark[263]
-        left_mouth = landmarks.landmark[61]
-        right_mouth = landmarks.landmark[291]
-        chin = landmarks.landmark[18]
-        
-        # Convert to pixel coordinates
-        h, w = frame_shape[:2]
-        
-        # 3D model points (in mm, approximate head dimensions)
-        model_points = np.array([
-            (0.0, 0.0, 0.0),           # Nose tip
-            (0.0, -63.6, -12.5),       # Chin
-            (-43.3, 32.7, -26.0),      # Left eye left corner
-            (43.3, 32.7, -26.0),       # Right eye right corner
-            (-28.9, -28.9, -24.1),     # Left mouth corner
-            (28.9, -28.9, -24.1)       # Right mouth corner
-        ], dtype=np.float64)
-        
-        # Corresponding 2D image points
-        image_points = np.array([
-            (nose_tip.x * w, nose_tip.y * h),
-            (chin.x * w, chin.y * h),
-            (left_eye.x * w, left_eye.y * h),
-            (right_eye.x * w, right_eye.y * h),
-            (left_mouth.x * w, left_mouth.y * h),
-            (right_mouth.x * w, right_mouth.y * h)
-        ], dtype=np.float64)
-        
-        # Camera parameters
-        focal_length = w
-        center = (w / 2, h / 2)
-        camera_matrix = np.array([
-            [focal_length, 0, center[0]],
-            [0, focal_length, center[1]],
-            [0, 0, 1]
-        ], dtype=np.float64)
-        
-        dist_coeffs = np.zeros((4, 1))
-        
-        # Solve PnP
-        success, rotation_vector, translation_vector = cv2.solvePnP(
-            model_points, image_points, camera_matrix, dist_coeffs
-        )
+        # FaceLandmarker's facial transformation matrix replaces solvePnP
+        if self.transformation_matrix is not None:
+            return self.pose_estimator.matrix_euler_angles(self.transformation_matrix)
         
-        if success:
-            # Convert rotation vector to Euler angles
-            rotation_matrix, _ = cv2.Rodrigues(rotation_vector)
-            
-            # Extract Euler angles
-            sy = math.sqrt(rotation_matrix[0,0] * rotation_matrix[0,0] + rotation_matrix[1,0] * rotation_matrix[1,0])
-            singular = sy < 1e-6
-            
-            if not singular:
-                x = math.atan2(rotation_matrix[2,1], rotation_matrix[2,2])
-                y = math.atan2(-rotation_matrix[2,0], sy)
-                z = math.atan2(rotation_matrix[1,0], rotation_matrix[0,0])
-            else:
-                x = math.atan2(-rotation_matrix[1,2], rotation_matrix[1,1])
-                y = math.atan2(-rotation_matrix[2,0], sy)
-                z = 0
-            
-            # Convert to degrees
-            pitch = math.degrees(x)
-            yaw = math.degrees(y) 
-            roll = math.degrees(z)
-            
-            return pitch, yaw, roll
+        points = self.landmarks_to_array(landmarks)
         
-        return None, None, None
+        # 2D image points (nose tip, chin, eye corners, mouth corners)
+        return self.pose_estimator.estimate(points[self.POSE_INDEX_ARRAY, :2], frame_shape)
     
     def analyze_gaze(self, landmarks):
         """Advanced gaze analysis using iris tracking"""
-        if not landmarks:
+        if landmarks is None:
             return False
         
         # Calculate iris positions for both eyes
-        left_iris_x, left_iris_y = self.calculate_iris_position(
-            landmarks, self.LEFT_IRIS_INDICES, self.LEFT_EYE_INDICES
-        )
-        right_iris_x, right_iris_y = self.calculate_iris_position(
-            landmarks, self.RIGHT_IRIS_INDICES, self.RIGHT_EYE_INDICES
-        )
+        points = self.landmarks_to_array(landmarks)
+        (left_iris_x, left_iris_y), (right_iris_x, right_iris_y) = self.calculate_iris_positions(points)
         
         # Check if both irises are centered (looking at camera)
-        left_centered = (0.4 < left_iris_x < 0.6) and (0.4 < left_iris_y < 0.6)
-        right_centered = (0.4 < right_iris_x < 0.6) and (0.4 < right_iris_y < 0.6)
+        low, high = self.IRIS_WINDOW
+        left_centered = (low < left_iris_x < high) and (low < left_iris_y < high)
+        right_centered = (low < right_iris_x < high) and (low < right_iris_y < high)
         
         # Calculate average deviation from center
         avg_x_deviation = abs((left_iris_x + right_iris_x) / 2 - 0.5)
         avg_y_deviation = abs((left_iris_y + right_iris_y) / 2 - 0.5)
         
-        # Store gaze data for smoothing
+        # Gaze sample for smoothing
         gaze_score = 1.0 - (avg_x_deviation + avg_y_deviation)
-        self.gaze_buffer.append(gaze_score > 0.8)
+        self.gaze_sample = gaze_score > self.GAZE_SCORE_THRESHOLD
+        
+        # Keep raw ratios for structured results
+        self.left_iris_ratio = (left_iris_x, left_iris_y)
+        self.right_iris_ratio = (right_iris_x, right_iris_y)
         
         return left_centered and right_centered
     
-    def analyze_frame(self, frame):
-        """Main frame analysis function"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
+    def process_image(self, image, face_mesh=None):
+        """Run Face Mesh on a BGR image and return (landmark_list, landmark_array)"""
+        with self.metrics.measure("bgr_to_rgb"):
+            rgb_image = self.buffers.cvt_color(image, cv2.COLOR_BGR2RGB, "rgb" if face_mesh is None else "roi_rgb")
+        with self.metrics.measure("face_mesh"):
+            results = (face_mesh or self.face_mesh).process(rgb_image)
+        
+        if not results.multi_face_landmarks:
+            return None, None
+        
+        # Convert landmarks once per frame for vectorized math
+        face_landmarks = results.multi_face_landmarks[0]
+        with self.metrics.measure("to_array"):
+            if self.needs_full_landmarks:
+                points = self.landmarks_to_array(face_landmarks)
+            else:
+                points = self.gather_landmarks(face_landmarks)
+        return face_landmarks, points
+    
+    def run_landmarker(self, frame):
+        """Submit the frame to FaceLandmarker and return the newest landmark array (or None)"""
+        with self.metrics.measure("bgr_to_rgb"):
+            rgb_image = self.buffers.cvt_color(frame, cv2.COLOR_BGR2RGB, "rgb")
+        with self.metrics.measure("landmarker"):
+            output = self.landmark_engine.detect(rgb_image, self.frame_timestamp)
+        
+        # Drawing rebuilds a landmark list from the array
+        self.face_landmarks = None
+        if output is None:
+            self.transformation_matrix = None
+            self.blendshapes = None
+            return None
+        
+        self.transformation_matrix = output.transformation_matrix
+        self.blendshapes = output.blendshapes
+        return output.points
+    
+    def run_face_mesh(self, frame):
+        """Run full Face Mesh inference and return the landmark array (or None)"""
+        if self.landmark_engine is not None:
+            # FaceLandmarker tracks the face region itself, so no ROI cropping
+            return self.run_landmarker(frame)
+        
+        cropper = self.roi_cropper
+        if cropper is not None:
+            crop = cropper.crop(frame)
+            if crop is not None:
+                image, box = crop
+                _, points = self.process_image(image, self.roi_face_mesh)
+                if points is not None:
+                    # Landmark list is in crop coordinates, draw from the array instead
+                    self.face_landmarks = None
+                    points = cropper.to_frame(points, box, frame.shape)
+                    cropper.update(points, frame.shape)
+                    return points
+                
+                # Face left the crop: fall back to the full frame right away
+                cropper.reset()
+        
+        self.face_landmarks, points = self.process_image(frame)
+        if cropper is not None:
+            cropper.update(points, frame.shape)
+        return points
+    
+    def detect_landmarks(self, frame):
+        """Get this frame's landmarks from inference or the keyframe tracker"""
+        scheduler = self.keyframe_scheduler
+        if scheduler is None:
+            return self.run_face_mesh(frame)
+        
+        # Between keyframes, propagate the previous landmarks with optical flow
+        with self.metrics.measure("tracking"):
+            # Alternate two buffers: the scheduler keeps the previous frame's gray
+            self.gray_parity ^= 1
+            gray = self.buffers.cvt_color(frame, cv2.COLOR_BGR2GRAY, f"gray{self.gray_parity}", channels=1)
+            points = scheduler.track(gray)
+        if points is not None:
+            # Tracked frames keep the keyframe's pose matrix: mixing in solvePnP
+            # angles would flip the pose verdict between the two conventions
+            self.face_landmarks = None
+            return points
+        
+        points = self.run_face_mesh(frame)
+        scheduler.set_keyframe(gray, points)
+        return points
+    
+    def draw_face_mesh(self, frame, points):
+        """Draw face mesh contours for the current landmarks"""
+        if self.mp_drawing is None:
+            # The drawing helpers pull in matplotlib; headless runs never load them
+            import mediapipe as mp
+            self.mp_face_mesh = mp.solutions.face_mesh
+            self.mp_drawing = mp.solutions.drawing_utils
+            self.mp_drawing_styles = mp.solutions.drawing_styles
+        
+        landmarks = self.face_landmarks
+        if landmarks is None:
+            # Tracked frames only have the array, rebuild a landmark list for drawing
+            from mediapipe.framework.formats import landmark_pb2
+            landmarks = landmark_pb2.NormalizedLandmarkList(landmark=[
+                landmark_pb2.NormalizedLandmark(x=x, y=y, z=z) for x, y, z in points.tolist()
+            ])
+        
+        self.mp_drawing.draw_landmarks(
+            frame, landmarks,
+            self.mp_face_mesh.FACEMESH_CONTOURS,
+            None,
+            self.mp_drawing_styles.get_default_face_mesh_contours_style()
+        )
+    
+    def analyze_frame(self, frame, timestamp=None, decide=True):
+        """Main frame analysis function
+        
+        timestamp (seconds, defaults to now) places the frame in the
+        stability windows; recorded video passes its own timeline.
+        decide=False only measures the frame and leaves the smoothed
+        verdict to the caller (see decide()).
+        
+        Returns (annotated_frame, is_valid), or (DetectionResult, is_valid)
+        in headless mode where the frame is left untouched.
+        """
+        self.frame_timestamp = time.time() if timestamp is None else timestamp
+        
+        # A new resolution (adaptive quality, renegotiated camera) invalidates
+        # the ROI box, which is in pixels; the keyframe tracker re-keys by itself
+        if frame.shape != self.analysis_shape:
+            if self.roi_cropper is not None:
+                self.roi_cropper.reset()
+            self.analysis_shape = frame.shape
+        
+        points = self.detect_landmarks(frame)
         
         # Reset detection flags
         self.face_detected = False
         self.eyes_detected = False
         self.looking_at_camera = False
         self.head_pose_valid = False
+        self.left_iris_ratio = (None, None)
+        self.right_iris_ratio = (None, None)
+        self.gaze_sample = None
+        result = DetectionResult()
         
-        if results.multi_face_landmarks:
+        if points is None:
+            self.pose_estimator.reset()
+        else:
             self.face_detected = True
-            face_landmarks = results.multi_face_landmarks[0]
-            
-            # Draw face mesh (optional, can be disabled for performance)
-            self.mp_drawing.draw_landmarks(
-                frame, face_landmarks,
-                self.mp_face_mesh.FACEMESH_CONTOURS,
-                None,
-                self.mp_drawing_styles.get_default_face_mesh_contours_style()
-            )
             
-            # Analyze eyes
-            left_eye_landmarks = self.get_eye_landmarks(face_landmarks, self.LEFT_EYE_INDICES)
-            right_eye_landmarks = self.get_eye_landmarks(face_landmarks, self.RIGHT_EYE_INDICES)
-            
-            if left_eye_landmarks and right_eye_landmarks:
+            # Analyze eyes (refined mesh includes iris points)
+            landmark_start = time.perf_counter()
+            if len(points) > self.IRIS_INDEX_ARRAY.max():
                 self.eyes_detected = True
                 
                 # Calculate EAR for both eyes
-                left_ear = self.calculate_eye_aspect_ratio(left_eye_landmarks)
-                right_ear = self.calculate_eye_aspect_ratio(right_eye_landmarks)
+                left_ear, right_ear = self.calculate_eye_aspect_ratios(points)
                 avg_ear = (left_ear + right_ear) / 2.0
+                result.left_ear, result.right_ear, result.avg_ear = left_ear, right_ear, avg_ear
                 
                 # Check if eyes are open
                 eyes_open = avg_ear > self.EYE_ASPECT_RATIO_THRESHOLD
                 
                 if eyes_open:
                     # Analyze gaze direction
-                    gaze_valid = self.analyze_gaze(face_landmarks)
+                    gaze_valid = self.analyze_gaze(points)
                     self.looking_at_camera = gaze_valid
             
+            self.metrics.record("landmarks", time.perf_counter() - landmark_start)
+            
             # Head pose estimation
-            pitch, yaw, roll = self.estimate_head_pose(face_landmarks, frame.shape)
+            with self.metrics.measure("head_pose"):
+                pitch, yaw, roll = self.estimate_head_pose(points, frame.shape)
+            result.pitch, result.yaw, result.roll = pitch, yaw, roll
             
             if pitch is not None and yaw is not None:
                 # Check if head is facing camera
                 head_straight = (abs(pitch) < self.HEAD_POSE_THRESHOLD and 
                                abs(yaw) < self.HEAD_POSE_THRESHOLD)
                 self.head_pose_valid = head_straight
-                
-                # Display pose information on frame
-                pose_text = f"Pitch: {pitch:.1f}° Yaw: {yaw:.1f}° Roll: {roll:.1f}°"
-                cv2.putText(frame, pose_text, (10, frame.shape[0] - 60), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
-        # Update tracking buffers for smoothing
-        self.face_track_buffer.append(self.face_detected)
-        self.eye_track_buffer.append(self.eyes_detected)
-        self.pose_buffer.append(self.head_pose_valid)
-        
-        # Calculate smoothed results
-        face_stability = sum(self.face_track_buffer) / len(self.face_track_buffer) if self.face_track_buffer else 0
-        eye_stability = sum(self.eye_track_buffer) / len(self.eye_track_buffer) if self.eye_track_buffer else 0
-        pose_stability = sum(self.pose_buffer) / len(self.pose_buffer) if self.pose_buffer else 0
-        gaze_stability = sum(self.gaze_buffer) / len(self.gaze_buffer) if self.gaze_buffer else 0
-        
-        # Final determination with higher accuracy requirements
-        final_valid = (face_stability > 0.85 and 
-                      eye_stability > 0.8 and 
-                      pose_stability > 0.75 and
-                      gaze_stability > 0.7 and
-                      self.looking_at_camera)
+            
+            if not self.headless:
+                with self.metrics.measure("drawing"):
+                    # Draw face mesh (optional, can be disabled for performance)
+                    self.draw_face_mesh(frame, points)
+                    
+                    # Display pose information on frame
+                    if pitch is not None and yaw is not None:
+                        pose_text = f"Pitch: {pitch:.1f}° Yaw: {yaw:.1f}° Roll: {roll:.1f}°"
+                        cv2.putText(frame, pose_text, (10, frame.shape[0] - 60), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        
+        # Structured result for headless consumers
+        result.face_detected = self.face_detected
+        result.eyes_detected = self.eyes_detected
+        result.head_pose_valid = self.head_pose_valid
+        result.looking_at_camera = bool(self.looking_at_camera)
+        result.left_iris_x, result.left_iris_y = self.left_iris_ratio
+        result.right_iris_x, result.right_iris_y = self.right_iris_ratio
+        if points is not None:
+            result.blendshapes = self.blendshapes
+        self.last_result = result
+        
+        # Smoothed final determination (thresholds with hysteresis live in the tracker)
+        final_valid = self.decide(result, self.gaze_sample, self.frame_timestamp) if decide else False
         
+        # Raw landmarks for offline re-scoring and threshold calibration
+        if self.landmark_cache is not None:
+            with self.metrics.measure("landmark_cache"):
+                self.landmark_cache.append(self.frame_timestamp, points, result.pitch, result.yaw, result.roll)
+        if self.calibrator is not None:
+            self.calibrator.add(self.frame_timestamp, points, result.pitch, result.yaw, result.roll)
+        
+        if self.headless:
+            return result, final_valid
         return frame, final_valid
     
+    def decide(self, result, gaze_sample, timestamp):
+        """Feed one frame's raw checks to the stability windows and complete its verdict"""
+        stability = self.stability
+        result.is_valid = stability.update(
+            timestamp,
+            result.face_detected, result.eyes_detected, result.head_pose_valid,
+            result.looking_at_camera, gaze_sample
+        )
+        result.face_stability = stability.stability("face")
+        result.eye_stability = stability.stability("eye")
+        result.pose_stability = stability.stability("pose")
+        result.gaze_stability = stability.stability("gaze")
+        return result.is_valid
+    
+    def warm_up(self, frame_shape=(480, 640, 3), frames=3):
+        """Run the models on synthetic frames so the first real frame is not the slow one
+        
+        Graph initialization, kernel selection and buffer allocation all
+        happen on the first calls. Session state is reset afterwards.
+        """
+        if self.face_mesh is None and self.landmark_engine is None:
+            return
+        from synthetic import draw_face
+        
+        height, width = frame_shape[:2]
+        face = draw_face(width, height)
+        
+        # A final empty frame makes the mesh drop the synthetic face
+        for frame in [face] * frames + [np.zeros_like(face)]:
+            self.analyze_frame(frame.copy())
+        
+        # Warm-up frames must not show up in the session's component statistics
+        self.reset_statistics()
+        self.metrics.reset()
+        self.pose_estimator.reset()
+        self.pose_estimator.reset_statistics()
+        if self.roi_cropper:
+            self.roi_cropper.reset()
+            self.roi_cropper.reset_statistics()
+        if self.keyframe_scheduler:
+            self.keyframe_scheduler.reset_statistics()
+        if self.landmark_engine:
+            self.landmark_engine.reset_statistics()
+    
+    def apply_thresholds(self, thresholds):
+        """Decide with a rescoring.Thresholds set from now on"""
+        self.EYE_ASPECT_RATIO_THRESHOLD = thresholds.ear
+        self.IRIS_WINDOW = (thresholds.iris_low, thresholds.iris_high)
+        self.GAZE_SCORE_THRESHOLD = thresholds.gaze_score
+        self.HEAD_POSE_THRESHOLD = thresholds.head_pose
+        self.stability.set_thresholds({
+            "face": thresholds.face_stability,
+            "eye": thresholds.eye_stability,
+            "pose": thresholds.pose_stability,
+            "gaze": thresholds.gaze_stability
+        }, thresholds.exit_margin)
+        self.stability.alert_threshold = thresholds.alert_threshold
+    
+    def toggle_calibration(self):
+        """Start collecting an attentive segment for calibration, or cancel the running one"""
+        if self.transport:
+            print("\n⚠ Calibration needs in-process analysis; not available with analysis processes")
+            return
+        if self.calibrator is not None:
+            self.calibrator.cancel()
+            self.calibrator = None
+            print("\n🎯 Calibration cancelled")
+            return
+        
+        from rescoring import ThresholdCalibrator
+        self.calibrator = ThresholdCalibrator(self).start()
+        print(f"\n🎯 Calibrating: look at the camera for {self.calibrator.seconds:.0f} seconds...")
+    
+    def finish_calibration(self):
+        """Re-score the calibration segment over the threshold grid and apply the pick"""
+        calibrator, self.calibrator = self.calibrator, None
+        outcome = calibrator.finish()
+        if outcome.thresholds is None:
+            print(f"\n⚠ Calibration failed ({outcome.reason}); thresholds unchanged")
+            return
+        
+        self.apply_thresholds(outcome.thresholds)
+        print(f"\n🎯 Calibrated on {outcome.frames} frames: {outcome.thresholds} "
+              f"({outcome.valid_ratio * 100:.0f}% valid; {outcome.combinations:,} combinations "
+              f"re-scored in {outcome.elapsed * 1000:.0f} ms)")
+    
+    def reset_statistics(self):
+        """Restart the session counters, smoothing windows and latency stats"""
+        self.total_frames = 0
+        self.valid_frames = 0
+        self.start_time = time.time()
+        self.stability.reset()
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latency_samples = 0
+    
+    def report_quality(self, change):
+        """Print every adaptive quality change on its own line"""
+        print(f"\n🎚️  Quality level {change.level}: {change.width}px @ {change.fps:g} FPS ({change.reason})")
+    
+    def report_multiple_faces(self, event):
+        """Print multiple-faces events on their own line"""
+        if event.kind == "start":
+            print(f"\n👥 Multiple faces in view ({event.count})")
+        else:
+            print("\n👤 Back to a single person in view")
+    
+    def report_violation(self, event):
+        """Print violation start/stop events on their own line"""
+        if event.kind == "start":
+            print(f"\n🚨 Attention violation: {event.duration:.1f}s without looking at the camera")
+        else:
+            print(f"\n✅ Attention restored after {event.duration:.1f}s")
+    
     def display_status(self, frame):
         """Display detection status on frame"""
         # Calculate current time without valid detection
-        current_time = time.time()
-        if self.looking_at_camera:
-            self.last_valid_time = current_time
-        
-        time_since_valid = current_time - self.last_valid_time
+        time_since_valid = self.stability.time_since_attentive(time.time())
         
         # Determine status color and text
         if self.looking_at_camera:
             status_color = (0, 255, 0)  # Green
             status_text = "✓ LOOKING AT CAMERA"
-        elif time_since_valid > self.alert_threshold:
+        elif self.stability.in_violation:
             status_color = (0, 0, 255)  # Red
             status_text = f"⚠ ATTENTION REQUIRED! ({time_since_valid:.1f}s)"
         else:
             status_color = (0, 255, 255)  # Yellow
             status_text = "⚬ ADJUSTING POSITION..."
         
-        # Status bar background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (frame.shape[1], 80), (0, 0, 0), -1)
-        frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
+        # Status bar background (darkens the header strip in place)
+        self.buffers.darken_header(frame, height=80, alpha=0.7)
         
         # Main status text
         cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
@@ -383,8 +850,10 @@ class AdvancedFaceDetector:
         current_time = time.time()
         elapsed_time = current_time - self.start_time
         accuracy = (self.valid_frames / max(self.total_frames, 1)) * 100
-        fps = self.total_frames / max(elapsed_time, 1)
-        time_since_valid = current_time - self.last_valid_time
+        time_since_valid = self.stability.time_since_attentive(current_time)
+        
+        # Rolling FPS over recent frame intervals (falls back to session average)
+        fps = self.metrics.rate("frame_interval") or self.total_frames / max(elapsed_time, 1)
         
         # Status indicators
         status = "✓ VALID  " if self.looking_at_camera else "✗ INVALID"
@@ -393,21 +862,229 @@ class AdvancedFaceDetector:
         pose_status = "✓" if self.head_pose_valid else "✗"
         gaze_status = "✓" if self.looking_at_camera else "✗"
         
-        # Stability scores
-        face_stability = sum(self.face_track_buffer) / len(self.face_track_buffer) if self.face_track_buffer else 0
-        eye_stability = sum(self.eye_track_buffer) / len(self.eye_track_buffer) if self.eye_track_buffer else 0
-        gaze_stability = sum(self.gaze_buffer) / len(self.gaze_buffer) if self.gaze_buffer else 0
+        # Stability scores of the latest verdict (may come from an analysis process)
+        face_stability = self.last_result.face_stability
+        eye_stability = self.last_result.eye_stability
+        gaze_stability = self.last_result.gaze_stability
+        
+        # Share of frames that ran full inference
+        keyframe_text = ""
+        if self.keyframe_scheduler:
+            keyframe_text = f"KF:{self.keyframe_scheduler.keyframe_rate * 100:.0f}% "
+        
+        # People counted by the background multi-face check
+        people_text = ""
+        if self.multi_face:
+            people_text = f"People:{self.multi_face.person_count} "
         
         print(f"\r[{status}] Face:{face_status} Eyes:{eyes_status} Pose:{pose_status} Gaze:{gaze_status} | "
               f"Stability: F:{face_stability:.2f} E:{eye_stability:.2f} G:{gaze_stability:.2f} | "
               f"Acc:{accuracy:.1f}% FPS:{fps:.1f} Frames:{self.total_frames} "
-              f"Alert:{time_since_valid:.1f}s", 
+              f"Drop:{self.dropped_frames} Lat:{self.last_latency * 1000:.0f}ms "
+              f"{keyframe_text}{people_text}Alert:{time_since_valid:.1f}s", 
               end="", flush=True)
     
-    def run(self):
-        """Main detection loop"""
-        if not self.initialize_camera():
+    def publish_gauges(self):
+        """Expose point-in-time gauges and running totals next to the stage latencies"""
+        self.metrics.set_counter("frames_total", self.total_frames)
+        self.metrics.set_counter("valid_frames_total", self.valid_frames)
+        self.metrics.set_counter("dropped_frames_total", self.dropped_frames)
+        self.metrics.set_gauge("fps", self.metrics.rate("frame_interval"))
+        if self.transport:
+            self.metrics.set_counter("shm_dropped_frames_total", self.transport.dropped_frames)
+            self.metrics.set_counter("shm_worker_restarts_total", self.transport.worker_restarts)
+            self.metrics.set_gauge("shm_slots_in_use", self.transport.in_flight)
+        if self.keyframe_scheduler:
+            self.metrics.set_gauge("keyframe_rate", self.keyframe_scheduler.keyframe_rate)
+        if self.quality:
+            self.metrics.set_gauge("quality_level", self.quality.level_index)
+            self.metrics.set_gauge("processing_width", self.quality.level.width)
+            self.metrics.set_gauge("target_fps", self.quality.level.fps)
+            self.metrics.set_counter("adaptive_skipped_frames_total", self.quality.skipped_frames)
+        if self.multi_face:
+            self.metrics.set_gauge("person_count", self.multi_face.person_count)
+            self.metrics.set_gauge("multi_face_interval_frames", self.multi_face.interval_frames)
+            self.metrics.set_counter("multi_face_checks_total", self.multi_face.checks)
+            self.metrics.set_counter("multi_face_skipped_total", self.multi_face.skipped_checks)
+    
+    def record_latency(self, capture_time):
+        """Record capture-to-decision latency for the current frame"""
+        latency = time.perf_counter() - capture_time
+        self.metrics.record("capture_to_decision", latency)
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.latency_samples += 1
+        
+        if self.frame_reader:
+            self.dropped_frames = self.frame_reader.dropped_frames
+        return latency
+    
+    def read_frame(self):
+        """Read the next frame and its capture timestamp"""
+        with self.metrics.measure("capture"):
+            if self.frame_reader:
+                return self.frame_reader.read()
+            
+            # Decode into the previous frame's buffer (it was already flipped out of)
+            ret, frame = self.cap.read(self.capture_frame)
+            if ret:
+                self.capture_frame = frame
+            return ret, frame, time.perf_counter()
+    
+    def apply_result(self, result):
+        """Adopt a verdict computed elsewhere (e.g. by an analysis process)"""
+        self.face_detected = result.face_detected
+        self.eyes_detected = result.eyes_detected
+        self.head_pose_valid = result.head_pose_valid
+        self.looking_at_camera = result.looking_at_camera
+        self.left_iris_ratio = (result.left_iris_x, result.left_iris_y)
+        self.right_iris_ratio = (result.right_iris_x, result.right_iris_y)
+        self.last_result = result
+    
+    def exchange_frame(self, frame, capture_time):
+        """Publish a frame to the analysis processes and take back finished verdicts
+        
+        Returns (annotated_frame, is_valid) for the newest completed frame, read
+        straight from its shared-memory slot, or (None, False) if none finished.
+        """
+        transport = self.transport
+        if not transport.started:
+            # Slots are sized from the first real frame, whatever the camera negotiated.
+            # That frame went stale while the models loaded, so it is not analyzed.
+            transport.start(frame.shape)
+            return None, False
+        
+        # The slot shown last iteration can be reused now
+        if self.held_slot is not None:
+            transport.release(self.held_slot)
+            self.held_slot = None
+        
+        # A crashed analysis process is replaced and its slot reclaimed
+        transport.check_workers(time.perf_counter())
+        
+        slot = transport.acquire()
+        if slot is not None:
+            # Mirror straight into shared memory; this is the frame's only copy
+            with self.metrics.measure("flip"):
+                cv2.flip(frame, 1, dst=transport.frame(slot))
+            transport.submit(slot, capture_time)
+        
+        # Every slot busy: give the analysis processes a moment instead of spinning
+        records = transport.collect(timeout=0.0 if slot is not None else 0.005)
+        newest = self.consume_records(records)
+        if newest is None:
+            return None, False
+        
+        done_slot, result = newest
+        self.apply_result(result)
+        self.held_slot = done_slot
+        return transport.frame(done_slot), result.is_valid
+    
+    def consume_records(self, records):
+        """Decide finished frames in capture order and return (slot, result) of the newest one
+        
+        Analysis processes only measure; the stability windows and hysteresis
+        live here and need every frame in sequence, so records that overtook an
+        earlier frame wait in reorder_buffer. All other slots are released.
+        """
+        transport = self.transport
+        buffer = self.reorder_buffer
+        for record in records:
+            if record[1] < self.next_verdict_id:
+                # Already skipped; deciding it now would run the windows backwards
+                transport.release(record[0])
+            else:
+                buffer[record[1]] = record
+        
+        newest = None
+        while True:
+            # Skip frames that will not come back: their analysis process died
+            while self.next_verdict_id in transport.lost_frame_ids:
+                transport.lost_frame_ids.discard(self.next_verdict_id)
+                self.next_verdict_id += 1
+            if buffer and self.next_verdict_id not in buffer:
+                oldest = min(buffer)
+                if time.perf_counter() - buffer[oldest][2] > self.reorder_timeout:
+                    self.next_verdict_id = oldest
+            if self.next_verdict_id not in buffer:
+                break
+            
+            done_slot, _, done_capture_time, _, analysis_time, fields, gaze_sample = buffer.pop(self.next_verdict_id)
+            self.next_verdict_id += 1
+            result = DetectionResult(*fields)
+            self.metrics.record("analysis", analysis_time)
+            latency = self.record_latency(done_capture_time)
+            
+            # Windows run on the wall clock, like in-process analysis and the violation clips
+            self.decide(result, gaze_sample, time.time() - latency)
+            self.total_frames += 1
+            if result.is_valid:
+                self.valid_frames += 1
+            if self.streamer:
+                self.streamer.publish(self.total_frames, time.time(), result)
+            if self.telemetry:
+                self.telemetry.append(time.time(), result)
+            
+            # Only the newest frame is displayed, older ones go straight back
+            if newest is not None:
+                transport.release(newest[0])
+            newest = (done_slot, result)
+        return newest
+    
+    def drain_transport(self, timeout=2.0):
+        """Collect the verdicts still in flight before the analysis processes stop"""
+        transport = self.transport
+        if self.held_slot is not None:
+            transport.release(self.held_slot)
+            self.held_slot = None
+        
+        deadline = time.perf_counter() + timeout
+        while transport.in_flight and time.perf_counter() < deadline:
+            transport.check_workers(time.perf_counter())
+            newest = self.consume_records(transport.collect(timeout=0.05))
+            if newest is not None:
+                self.apply_result(newest[1])
+                transport.release(newest[0])
+    
+    def run(self, threaded_capture=False, metrics_port=None, analysis_processes=0, detector_options=None,
+            streamer=None, evidence=None, startup=None, camera_id=0, stop_event=None, quality=None,
+            multi_face=None, telemetry=None, landmark_cache=None):
+        """Main detection loop
+        
+        With analysis_processes > 0 this process only captures and displays;
+        frames go to that many analysis processes through shared memory.
+        A connected ResultStreamer receives every verdict and violation event;
+        an EvidenceRecorder keeps a pre-roll and saves a clip per violation.
+        A StartupTimer gets its camera and first-verdict phases here; setting
+        stop_event ends the loop (used by the detector daemon). An
+        AdaptiveQualityController scales and paces in-process analysis, a
+        MultiFaceMonitor counts people on every Nth captured frame, a
+        TelemetryLog records every verdict's measurements, and a
+        LandmarkCache keeps the raw landmarks for offline re-scoring.
+        """
+        if not self.initialize_camera(camera_id):
             return
+        self.startup = startup
+        if startup:
+            startup.mark("camera")
+        
+        # Pull endpoint for per-stage latency percentiles
+        if metrics_port:
+            self.metrics_server = MetricsServer(self.metrics, port=metrics_port).start()
+            print(f"✓ Metrics at http://127.0.0.1:{metrics_port}/metrics (and /metrics.json)")
+        
+        # Decouple capture from analysis so stale frames never queue up
+        if threaded_capture:
+            self.frame_reader = LatestFrameReader(self.cap).start()
+            print("✓ Latest-frame capture thread started")
+        
+        # Spread analysis over several cores, sharing frames zero-copy
+        if analysis_processes > 0:
+            from shared_frames import SharedFrameTransport
+            options = dict(detector_options or {}, headless=self.headless)
+            self.transport = SharedFrameTransport(analysis_processes, options=options)
+            print(f"✓ {analysis_processes} analysis processes will read frames from shared memory")
         
         print("🔥 ADVANCED FACE DETECTION SYSTEM 🔥")
         print("Next-Level Accuracy for Online Test Monitoring")
@@ -417,55 +1094,160 @@ class AdvancedFaceDetector:
         print("  's' - Save screenshot")
         print("  'r' - Reset statistics")
         print("  'c' - Calibrate thresholds")
+        if self.headless:
+            print("  Headless mode: press Ctrl+C to stop")
         print("=" * 70)
         
-        calibration_mode = False
+        # Violations are announced as they start and end instead of polled
+        self.stability.subscribe(self.report_violation)
+        if streamer:
+            self.streamer = streamer
+            self.stability.subscribe(streamer.event)
+        if evidence:
+            self.evidence = evidence.start()
+            self.stability.subscribe(evidence.on_violation)
+            print(f"✓ Evidence clips ({evidence.pre_roll:.0f}s pre-roll, {evidence.post_roll:.0f}s post-roll) "
+                  f"go to {evidence.output_dir}/")
+        if quality and self.transport:
+            print("⚠ Adaptive quality needs in-process analysis; ignored with analysis processes")
+        elif quality:
+            self.quality = quality
+            quality.subscribe(self.report_quality)
+            if streamer:
+                quality.subscribe(streamer.quality)
+            print(f"✓ Adaptive quality: {quality.latency_budget * 1000:.0f} ms latency budget, "
+                  f"starting at {quality.level}")
+        if multi_face:
+            multi_face.metrics = self.metrics
+            self.multi_face = multi_face.start()
+            multi_face.subscribe(self.report_multiple_faces)
+            if streamer:
+                multi_face.subscribe(streamer.multiple_faces)
+            print(f"✓ Multiple-person check every {multi_face.interval_frames} frames at {multi_face.width}px")
+        if telemetry:
+            self.telemetry = telemetry
+            print(f"✓ Telemetry log in {telemetry.path}/")
+        if landmark_cache and self.transport:
+            print("⚠ The landmark cache needs in-process analysis; ignored with analysis processes")
+        elif landmark_cache:
+            self.landmark_cache = landmark_cache
+            print(f"✓ Landmark cache in {landmark_cache.path}/")
+        
+        last_frame_time = None
+        awaiting_first_verdict = startup is not None
+        
+        # The session clock starts now, after model loading and warm-up
+        self.start_time = time.time()
         
         try:
             while True:
-                ret, frame = self.cap.read()
+                if stop_event is not None and stop_event.is_set():
+                    break
+                
+                ret, frame, capture_time = self.read_frame()
                 if not ret:
                     break
                 
-                # Flip frame horizontally for mirror effect
-                frame = cv2.flip(frame, 1)
+                # Frames beyond the adaptive analysis rate are dropped unprocessed
+                if self.quality and not self.quality.due(time.perf_counter()):
+                    continue
+                
+                # Every Nth frame is copied to the background people counter
+                if self.multi_face:
+                    self.multi_face.offer(frame, time.time())
                 
-                # Analyze frame
-                processed_frame, is_valid = self.analyze_frame(frame)
+                # Frame-to-frame interval exposes stalls that a session average hides
+                frame_time = time.perf_counter()
+                if last_frame_time is not None:
+                    self.metrics.record("frame_interval", frame_time - last_frame_time)
+                last_frame_time = frame_time
                 
-                # Update statistics
-                self.total_frames += 1
-                if is_valid:
-                    self.valid_frames += 1
+                if self.transport:
+                    # Analysis runs in other processes; statistics are updated per verdict
+                    processed_frame, is_valid = self.exchange_frame(frame, capture_time)
+                    if processed_frame is None:
+                        continue
+                else:
+                    # Adaptive processing resolution (before the flip, which then costs less)
+                    size = self.quality.processing_size(frame.shape) if self.quality else None
+                    if size:
+                        with self.metrics.measure("resize"):
+                            frame = self.buffers.resize(frame, size)
+                    
+                    # Flip frame horizontally for mirror effect
+                    with self.metrics.measure("flip"):
+                        frame = self.buffers.flip(frame)
+                    
+                    # Analyze frame
+                    processed_frame, is_valid = self.analyze_frame(frame)
+                    latency = self.record_latency(capture_time)
+                    if self.quality:
+                        self.quality.observe(time.perf_counter(), latency)
+                    if self.calibrator is not None and self.calibrator.complete(self.frame_timestamp):
+                        self.finish_calibration()
+                    
+                    # Update statistics
+                    self.total_frames += 1
+                    if is_valid:
+                        self.valid_frames += 1
+                    if self.streamer:
+                        self.streamer.publish(self.total_frames, time.time(), self.last_result)
+                    if self.telemetry:
+                        with self.metrics.measure("telemetry"):
+                            self.telemetry.append(time.time(), self.last_result)
                 
-                # Display status
-                display_frame = self.display_status(processed_frame)
+                if awaiting_first_verdict:
+                    awaiting_first_verdict = False
+                    startup.mark("first_verdict")
+                    startup.publish(self.metrics)
+                    print(f"\n🚀 Startup: {startup.format_line()}")
                 
-                # Show frame
-                cv2.imshow('Advanced Face Detection - Next Level Accuracy', display_frame)
+                if not self.headless:
+                    # Display status
+                    with self.metrics.measure("display_status"):
+                        display_frame = self.display_status(processed_frame)
+                    
+                    # Show frame
+                    with self.metrics.measure("imshow"):
+                        cv2.imshow('Advanced Face Detection - Next Level Accuracy', display_frame)
                 
-                # Print terminal status every few frames
+                # Pre-roll for violation clips: a sampled copy, encoded on another thread
+                if self.evidence:
+                    with self.metrics.measure("evidence"):
+                        if not self.headless:
+                            evidence_frame = display_frame
+                        elif self.transport:
+                            evidence_frame = processed_frame
+                        else:
+                            evidence_frame = frame
+                        self.evidence.add_frame(evidence_frame, time.time(), self.last_result)
+                
+                # Print terminal status every few frames (the stream replaces it)
                 if self.total_frames % 3 == 0:
-                    self.print_terminal_status()
+                    self.publish_gauges()
+                    if not self.streamer:
+                        self.print_terminal_status()
+                
+                # Headless mode has no window or keyboard controls
+                if self.headless:
+                    continue
                 
-                # Handle keyboard input
-                key = cv2.waitKey(1) & 0xFF
+                # Handle keyboard input (HighGUI renders the window here)
+                with self.metrics.measure("wait_key"):
+                    key = cv2.waitKey(1) & 0xFF
                 if key == ord('q'):
                     break
                 elif key == ord('s'):
+                    # Encode and write off the loop; the buffer is reused next frame
                     filename = f"detection_screenshot_{int(time.time())}.jpg"
-                    cv2.imwrite(filename, display_frame)
+                    threading.Thread(target=cv2.imwrite, args=(filename, display_frame.copy()),
+                                     daemon=True).start()
                     print(f"\n📸 Screenshot saved: {filename}")
                 elif key == ord('r'):
-                    # Reset statistics
-                    self.total_frames = 0
-                    self.valid_frames = 0
-                    self.start_time = time.time()
-                    self.last_valid_time = time.time()
+                    self.reset_statistics()
                     print(f"\n🔄 Statistics reset!")
                 elif key == ord('c'):
-                    print(f"\n🎯 Calibration mode toggled!")
-                    calibration_mode = not calibration_mode
+                    self.toggle_calibration()
         
         except KeyboardInterrupt:
             print("\n\n🛑 Shutting down gracefully...")
@@ -475,9 +1257,28 @@ class AdvancedFaceDetector:
     
     def cleanup(self):
         """Clean up resources and display final statistics"""
+        if self.frame_reader:
+            self.frame_reader.stop()
+            self.dropped_frames = self.frame_reader.dropped_frames
+        if self.transport:
+            if self.transport.started:
+                self.drain_transport()
+            self.transport.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.streamer:
+            self.streamer.close()
+        if self.multi_face:
+            self.multi_face.stop()
+        if self.calibrator:
+            self.calibrator.cancel()
+        if self.evidence:
+            # Clips still collecting post-roll are written with what they have
+            self.evidence.stop()
         if self.cap:
             self.cap.release()
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
         
         # Final comprehensive statistics
         print("\n\n" + "=" * 70)
@@ -494,6 +1295,92 @@ class AdvancedFaceDetector:
         print(f"⏱️  Session Duration: {elapsed_time:.1f} seconds")
         print(f"📈 Average FPS: {avg_fps:.1f}")
         
+        stability = self.stability
+        if stability.violation_count:
+            print(f"🚨 Attention Violations: {stability.violation_count:,} "
+                  f"({stability.violation_seconds:.1f}s closed{', one still open' if stability.in_violation else ''})")
+        if self.startup:
+            print(f"🚀 Startup: {self.startup.format_line()}")
+        if self.latency_samples:
+            avg_latency = self.total_latency / self.latency_samples
+            print(f"⚡ Capture-to-Decision Latency: avg {avg_latency * 1000:.1f} ms, max {self.max_latency * 1000:.1f} ms")
+        if self.keyframe_scheduler:
+            scheduler = self.keyframe_scheduler
+            forced = ", ".join(f"{reason} {count}" for reason, count in scheduler.forced_by.items())
+            print(f"🔑 Keyframe Rate: {scheduler.keyframe_rate * 100:.1f}% "
+                  f"({scheduler.keyframes:,} inferences, {scheduler.tracked_frames:,} tracked; forced by {forced})")
+        if self.landmark_engine:
+            engine = self.landmark_engine
+            print(f"🧩 FaceLandmarker ({engine.running_mode}): {engine.completed:,} of {engine.submitted:,} results, "
+                  f"avg {engine.average_latency * 1000:.1f} ms submit-to-result")
+            engine.close()
+        if self.pose_estimator.calls:
+            estimator = self.pose_estimator
+            print(f"🧭 Head Pose ({estimator.solver}): avg {estimator.average_time * 1000:.2f} ms per solve")
+        if self.roi_cropper:
+            cropper = self.roi_cropper
+            print(f"✂️  ROI Inference: {cropper.roi_frames:,} cropped, {cropper.full_frames:,} full-frame")
+        if self.frame_reader:
+            print(f"🗑️  Dropped Stale Frames: {self.dropped_frames:,} of {self.frame_reader.captured_frames:,} captured")
+        if self.transport:
+            transport = self.transport
+            print(f"🔀 Shared-Memory Analysis ({transport.num_workers} processes, {transport.slots} slots): "
+                  f"{transport.completed_frames:,} of {transport.submitted_frames:,} analyzed, "
+                  f"{transport.dropped_frames:,} dropped with all slots busy")
+            if transport.worker_restarts:
+                print(f"💥 Analysis Process Restarts: {transport.worker_restarts:,}")
+        if self.streamer:
+            streamer = self.streamer
+            print(f"📡 Result Stream ({streamer.target}): {streamer.frames_published:,} frames in "
+                  f"{streamer.records_written:,} records / {streamer.batches_written:,} writes, "
+                  f"{streamer.events_written:,} violation events, {streamer.records_dropped:,} dropped")
+        if self.quality:
+            quality = self.quality
+            seconds = quality.time_at_levels(time.perf_counter())
+            spent = ", ".join(f"{level} {time_at / max(sum(seconds), 1e-6) * 100:.0f}%"
+                              for level, time_at in zip(quality.levels, seconds) if time_at > 0)
+            print(f"🎚️  Adaptive Quality: {len(quality.changes):,} changes, "
+                  f"{quality.skipped_frames:,} frames paced out; ran at {spent or quality.level}")
+        if self.multi_face:
+            monitor = self.multi_face
+            print(f"👥 Multiple-Person Check: {monitor.checks:,} checks every {monitor.interval_frames} frames "
+                  f"(avg {monitor.average_time * 1000:.1f} ms at {monitor.width}px, {monitor.skipped_checks:,} skipped), "
+                  f"max {monitor.max_count} in view, {monitor.event_count:,} multiple-face events")
+        if self.evidence:
+            evidence = self.evidence
+            print(f"🎞️  Evidence: {evidence.clips_written:,} clips in {evidence.output_dir}/, "
+                  f"{evidence.sampled_frames:,} frames buffered, {evidence.dropped_frames:,} skipped by a busy encoder, "
+                  f"{evidence.dropped_clips:,} clips dropped")
+        if self.telemetry:
+            telemetry = self.telemetry
+            query_start = time.perf_counter()
+            report = telemetry.summary(stability.alert_threshold)
+            _, valid_ratio = telemetry.validity_histogram()
+            query_time = time.perf_counter() - query_start
+            print(f"📼 Telemetry ({telemetry.path}/): {report['frames']:,} frames, "
+                  f"{report['looking_away_s']:.1f}s looking away, longest violation "
+                  f"{report['longest_violation_s']:.1f}s (queried in {query_time * 1000:.1f} ms)")
+            if len(valid_ratio):
+                shown = " ".join(f"{ratio * 100:.0f}%" for ratio in valid_ratio[:30])
+                print(f"   Valid per minute: {shown}{' …' if len(valid_ratio) > 30 else ''}")
+            telemetry.close()
+        if self.landmark_cache:
+            cache = self.landmark_cache
+            cache.close()
+            print(f"🗂️  Landmark Cache: {cache.count:,} frames ({cache.nbytes / 1e6:.1f} MB) in {cache.path}/ "
+                  f"(re-score with: python rescoring.py {cache.path})")
+        if self.total_frames:
+            pool = self.buffers
+            print(f"🧮 Frame Buffers: {pool.allocations:,} allocations ({pool.allocated_bytes / 1e6:.1f} MB pooled), "
+                  f"{pool.reuses:,} reuses")
+        
+        # Where each millisecond went
+        if self.metrics.stages:
+            print("-" * 70)
+            print("⏱️  Per-Stage Latency (rolling window)")
+            print(self.metrics.format_table())
+            print("-" * 70)
+        
         # Performance rating
         if accuracy >= 95:
             rating = "🏆 EXCELLENT"
@@ -509,16 +1396,147 @@ class AdvancedFaceDetector:
         print("Thank you for using Advanced Face Detection System!")
         print("=" * 70)
 
+def build_detector(headless=False, keyframe_interval=0, roi=False, pose_solver="iterative", calibration=None,
+                   engine="face_mesh", landmarker_model=None, landmarker_mode="live_stream",
+                   blendshapes=False, matrix_pose=False, analysis=True):
+    """Create a detector with the optional pipeline components enabled
+    
+    analysis=False builds a model-free capture/display front end for runs
+    whose frames are analyzed in other processes.
+    """
+    if not analysis:
+        return AdvancedFaceDetector(headless=headless, load_models=False)
+    
+    landmark_engine = None
+    if engine == "landmarker":
+        if not landmarker_model:
+            raise ValueError("The landmarker engine needs --landmarker-model (face_landmarker.task)")
+        from landmarker import FaceLandmarkerEngine
+        landmark_engine = FaceLandmarkerEngine(landmarker_model, running_mode=landmarker_mode,
+                                               blendshapes=blendshapes, transformation_matrix=matrix_pose)
+    
+    keyframe_scheduler = None
+    if keyframe_interval > 1:
+        from tracking import KeyframeScheduler
+        keyframe_scheduler = KeyframeScheduler(max_interval_frames=keyframe_interval)
+    
+    roi_cropper = None
+    if roi:
+        from roi import FaceRoiCropper
+        roi_cropper = FaceRoiCropper()
+    
+    pose_estimator = HeadPoseEstimator(solver=pose_solver, calibration_file=calibration)
+    
+    return AdvancedFaceDetector(headless=headless, keyframe_scheduler=keyframe_scheduler,
+                                roi_cropper=roi_cropper, pose_estimator=pose_estimator,
+                                landmark_engine=landmark_engine)
+
+def add_detector_arguments(parser):
+    """Command-line options that select the detector's pipeline components"""
+    parser.add_argument("--keyframe-interval", type=int, default=0,
+                        help="run Face Mesh at most every N frames and track landmarks in between (0 = every frame)")
+    parser.add_argument("--roi", action="store_true",
+                        help="run Face Mesh on a downscaled crop around the previous face")
+    parser.add_argument("--pose-solver", choices=sorted(SOLVERS), default="iterative",
+                        help="solvePnP algorithm for head pose")
+    parser.add_argument("--calibration", help="camera calibration file (.json or .npz)")
+    parser.add_argument("--engine", choices=["face_mesh", "landmarker"], default="face_mesh",
+                        help="legacy Face Mesh solution or the MediaPipe Tasks FaceLandmarker")
+    parser.add_argument("--landmarker-model", help="face_landmarker.task model bundle for --engine landmarker")
+    parser.add_argument("--landmarker-mode", choices=["live_stream", "video"], default="live_stream",
+                        help="asynchronous LIVE_STREAM inference or synchronous VIDEO mode")
+    parser.add_argument("--blendshapes", action="store_true", help="include FaceLandmarker blendshape scores")
+    parser.add_argument("--matrix-pose", action="store_true",
+                        help="take head pose from FaceLandmarker's transformation matrix instead of solvePnP")
+
+def detector_options(args):
+    """build_detector() keyword arguments from parsed add_detector_arguments() options"""
+    return dict(keyframe_interval=args.keyframe_interval, roi=args.roi,
+                pose_solver=args.pose_solver, calibration=args.calibration,
+                engine=args.engine, landmarker_model=args.landmarker_model,
+                landmarker_mode=args.landmarker_mode, blendshapes=args.blendshapes,
+                matrix_pose=args.matrix_pose)
+
 def main():
     """Main function with enhanced startup"""
+    startup = StartupTimer(origin=STARTUP_ORIGIN)
+    startup.mark("imports")
+    
+    parser = argparse.ArgumentParser(description="Advanced Face Detection & Eye Tracking System")
+    parser.add_argument("--threaded-capture", action="store_true",
+                        help="read frames on a background thread and always analyze the newest one")
+    parser.add_argument("--headless", action="store_true",
+                        help="skip all drawing and windows; only run detection")
+    add_detector_arguments(parser)
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve per-stage latency metrics over HTTP on this port")
+    parser.add_argument("--analysis-processes", type=int, default=0,
+                        help="analyze frames in N separate processes fed through shared memory (0 = in-process)")
+    parser.add_argument("--stream", metavar="TARGET",
+                        help="stream batched NDJSON verdicts to - (stdout), unix:<path> or tcp:<host>:<port>")
+    parser.add_argument("--session-id", help="session id included in streamed records")
+    parser.add_argument("--latency-budget", type=float, default=None, metavar="MS",
+                        help="adapt processing resolution and analysis rate to hold this p95 latency")
+    parser.add_argument("--multi-face-interval", type=int, default=0, metavar="N",
+                        help="count people with the face detection model every N frames in the background (0 = off)")
+    parser.add_argument("--multi-face-width", type=int, default=320,
+                        help="width of the downscaled copy the people count runs on")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="log every frame's measurements to a memory-mapped columnar store here")
+    parser.add_argument("--landmark-cache", metavar="DIR",
+                        help="keep every frame's raw landmarks here for re-scoring with other thresholds")
+    parser.add_argument("--evidence-dir", help="save a clip and JSON sidecar for every attention violation here")
+    parser.add_argument("--pre-roll", type=float, default=5.0, help="seconds of evidence before a violation")
+    parser.add_argument("--post-roll", type=float, default=3.0, help="seconds of evidence after a violation")
+    args = parser.parse_args()
+    
+    # Connect first: streaming to stdout moves all human-readable output to stderr
+    streamer = None
+    if args.stream:
+        from streaming import ResultStreamer
+        streamer = ResultStreamer(args.stream, session_id=args.session_id).connect()
+    
     print("🚀 Initializing Advanced Face Detection System...")
     print("📦 Loading MediaPipe Face Mesh...")
     print("🎥 Preparing camera interface...")
     print()
     
     try:
-        detector = AdvancedFaceDetector()
-        detector.run()
+        options = detector_options(args)
+        # With analysis processes the models load there, not in this process
+        detector = build_detector(headless=args.headless, analysis=args.analysis_processes == 0, **options)
+        startup.mark("models")
+        detector.warm_up()
+        startup.mark("warm_up")
+        
+        evidence = None
+        if args.evidence_dir:
+            from evidence import EvidenceRecorder
+            evidence = EvidenceRecorder(args.evidence_dir, pre_roll=args.pre_roll, post_roll=args.post_roll)
+        quality = None
+        if args.latency_budget:
+            from adaptive import AdaptiveQualityController
+            quality = AdaptiveQualityController(latency_budget=args.latency_budget / 1000)
+        multi_face = None
+        if args.multi_face_interval > 0:
+            from multiface import MultiFaceMonitor
+            multi_face = MultiFaceMonitor(interval_frames=args.multi_face_interval, width=args.multi_face_width)
+        telemetry = None
+        if args.telemetry:
+            from telemetry import TelemetryLog
+            telemetry = TelemetryLog(args.telemetry)
+        landmark_cache = None
+        if args.landmark_cache:
+            from rescoring import LandmarkCache, Thresholds
+            landmark_cache = LandmarkCache(args.landmark_cache, attributes={
+                "thresholds": Thresholds.from_detector(detector).to_dict(),
+                "windows": {name: window.seconds for name, window in detector.stability.windows.items()}
+            })
+        detector.run(threaded_capture=args.threaded_capture, metrics_port=args.metrics_port,
+                     analysis_processes=args.analysis_processes, detector_options=options,
+                     streamer=streamer, evidence=evidence, startup=startup,
+                     quality=quality, multi_face=multi_face, telemetry=telemetry,
+                     landmark_cache=landmark_cache)
     except ImportError as e:
         print("❌ Missing required package!")
         print("Please install: pip install mediapipe opencv-python numpy")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Offline Batch Analyzer for Recorded Exam Videos
+Splits recordings into time chunks, analyzes them on a process pool and
+writes a per-frame timeline plus a violation summary for every video
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import warnings
+warnings.filterwarnings("ignore")
+
+import cv2
+
+TIMELINE_FIELDS = [
+    "frame", "time", "is_valid", "face_detected", "eyes_detected", "head_pose_valid",
+    "looking_at_camera", "left_ear", "right_ear", "left_iris_x", "left_iris_y",
+    "right_iris_x", "right_iris_y", "pitch", "yaw", "roll",
+    "face_stability", "eye_stability", "pose_stability", "gaze_stability"
+]
+
+# Per-process Face Mesh shared by every chunk the worker analyzes. Static
+# image mode keeps no tracking state, so a frame's landmarks never depend on
+# which chunk (or video) the worker analyzed before
+_worker_face_mesh = None
+
+def _init_worker():
+    """Create the worker's Face Mesh once"""
+    global _worker_face_mesh
+    from app import create_face_mesh
+    _worker_face_mesh = create_face_mesh(static_image_mode=True)
+
+def smoothing_history(detector, fps, sample_every=1):
+    """Number of sampled frames spanning the longest stability window"""
+    return int(detector.stability.longest_window * fps / sample_every) + 1
+
+def buffers_full(detector):
+    """Whether every stability window spans its full duration"""
+    return detector.stability.saturated
+
+def verdict_settled(detector):
+    """Whether the smoothed verdict now matches a sequential pass
+
+    Full windows hold the same samples, and a verdict that did not depend
+    on the previous one also fixes the hysteresis state.
+    """
+    return buffers_full(detector) and detector.stability.decisive
+
+def probe_video(path):
+    """Return (frame_count, fps) for a video file
+
+    frame_count is 0 or negative when the container does not record it
+    (e.g. WebM).
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise Exception(f"Cannot open video: {path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frame_count, fps
+
+def plan_chunks(frame_count, fps, chunk_seconds):
+    """Split [0, frame_count) into (start, end) frame ranges of chunk_seconds
+
+    An unknown frame count gives one (0, None) range read to the end.
+    """
+    if frame_count <= 0:
+        return [(0, None)]
+    chunk_frames = max(int(chunk_seconds * fps), 1)
+    return [(start, min(start + chunk_frames, frame_count))
+            for start in range(0, frame_count, chunk_frames)]
+
+def read_sampled_frames(cap, start, end, sample_every, mirror=False):
+    """Yield (frame_index, frame) for sampled frames in [start, end), or to the end for end=None"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    frame_index = start
+    while end is None or frame_index < end:
+        # Skip unsampled frames without decoding them
+        if frame_index % sample_every:
+            if not cap.grab():
+                return
+            frame_index += 1
+            continue
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        if mirror:
+            frame = cv2.flip(frame, 1)
+        yield frame_index, frame
+        frame_index += 1
+
+def analyze_chunk(path, start, end, fps, sample_every=1, mirror=False):
+    """Analyze frames [start, end) of a video and return timeline rows
+
+    Each chunk first replays sampled frames before its start so the
+    stability windows and the hysteresis state match what a sequential pass
+    would have at the boundary. The gaze window only gets samples while the
+    eyes are open and hysteresis can hold a verdict indefinitely, so the
+    replay is deepened until a settled verdict was seen or the video start
+    is reached. Head pose is solved without warm start for the same reason.
+    """
+    from app import AdvancedFaceDetector
+    from pose import HeadPoseEstimator
+
+    # Sampling is aligned to absolute frame indices so chunking never shifts it
+    first_sampled = -(-start // sample_every) * sample_every
+    cap = cv2.VideoCapture(path)
+
+    lookback = None
+    while True:
+        detector = AdvancedFaceDetector(headless=True, face_mesh=_worker_face_mesh,
+                                        pose_estimator=HeadPoseEstimator(warm_start=False))
+        history = smoothing_history(detector, fps, sample_every)
+        lookback = history if lookback is None else lookback * 4
+        warmup_start = max(first_sampled - lookback * sample_every, 0)
+
+        settled = False
+        for frame_index, frame in read_sampled_frames(cap, warmup_start, first_sampled, sample_every, mirror):
+            detector.analyze_frame(frame, frame_index / fps)
+            settled = settled or verdict_settled(detector)
+
+        if warmup_start == 0 or settled:
+            break
+
+    rows = []
+    for frame_index, frame in read_sampled_frames(cap, first_sampled, end, sample_every, mirror):
+        # The video's own timeline drives the stability windows
+        result, is_valid = detector.analyze_frame(frame, frame_index / fps)
+        record = result.to_dict()
+        record["frame"] = frame_index
+        record["time"] = frame_index / fps
+        rows.append([record[field] for field in TIMELINE_FIELDS])
+
+    cap.release()
+    return rows
+
+def summarize_timeline(rows, fps, sample_every, alert_threshold=3.0):
+    """Build a violation summary from timeline rows"""
+    valid_column = TIMELINE_FIELDS.index("is_valid")
+    time_column = TIMELINE_FIELDS.index("time")
+    frame_interval = sample_every / fps
+
+    violations = []
+    violation_start = None
+    for row in rows:
+        if not row[valid_column]:
+            if violation_start is None:
+                violation_start = row[time_column]
+        elif violation_start is not None:
+            violations.append((violation_start, row[time_column]))
+            violation_start = None
+    if violation_start is not None:
+        violations.append((violation_start, rows[-1][time_column] + frame_interval))
+
+    # Only sustained invalid periods count as violations, like the live alert
+    violations = [
+        {"start": round(start, 3), "end": round(end, 3), "duration": round(end - start, 3)}
+        for start, end in violations if end - start > alert_threshold
+    ]
+
+    valid_frames = sum(1 for row in rows if row[valid_column])
+    return {
+        "analyzed_frames": len(rows),
+        "valid_frames": valid_frames,
+        "accuracy": round(valid_frames / max(len(rows), 1) * 100, 2),
+        "violation_count": len(violations),
+        "violation_seconds": round(sum(v["duration"] for v in violations), 3),
+        "violations": violations
+    }
+
+def write_report(path, rows, summary, output_dir):
+    """Write <name>_timeline.csv and <name>_summary.json"""
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    timeline_path = os.path.join(output_dir, f"{name}_timeline.csv")
+    with open(timeline_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TIMELINE_FIELDS)
+        writer.writerows(rows)
+
+    summary_path = os.path.join(output_dir, f"{name}_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    return timeline_path, summary_path
+
+def analyze_videos(paths, output_dir="reports", workers=None, chunk_seconds=120.0,
+                   sample_every=1, mirror=False, alert_threshold=3.0):
+    """Analyze several videos on one process pool and write their reports"""
+    workers = workers or os.cpu_count() or 1
+    ctx = multiprocessing.get_context("spawn")
+    summaries = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        # Submit every chunk of every video up front to keep all cores busy
+        jobs = []
+        for path in paths:
+            frame_count, fps = probe_video(path)
+            chunks = plan_chunks(frame_count, fps, chunk_seconds)
+            futures = [pool.submit(analyze_chunk, path, start, end, fps, sample_every, mirror)
+                       for start, end in chunks]
+            jobs.append((path, fps, frame_count, futures))
+            if frame_count > 0:
+                print(f"📼 {os.path.basename(path)}: {frame_count:,} frames, {len(chunks)} chunks")
+            else:
+                print(f"📼 {os.path.basename(path)}: frame count unknown, reading sequentially")
+
+        for path, fps, frame_count, futures in jobs:
+            start_time = time.time()
+            rows = []
+            for future in futures:
+                rows.extend(future.result())
+
+            summary = summarize_timeline(rows, fps, sample_every, alert_threshold)
+            if frame_count <= 0:
+                # Up to the last analyzed frame; sampling may hide a few trailing ones
+                frame_count = rows[-1][0] + 1 if rows else 0
+            summary.update({
+                "video": path,
+                "fps": fps,
+                "total_frames": frame_count,
+                "duration_seconds": round(frame_count / fps, 3),
+                "sample_every": sample_every
+            })
+            timeline_path, summary_path = write_report(path, rows, summary, output_dir)
+            summaries[path] = summary
+
+            print(f"✓ {os.path.basename(path)}: accuracy {summary['accuracy']:.1f}%, "
+                  f"{summary['violation_count']} violations "
+                  f"(waited {time.time() - start_time:.1f}s) -> {summary_path}")
+
+    return summaries
+
+def main():
+    """Batch analyze recorded exam videos"""
+    parser = argparse.ArgumentParser(description="Offline batch analyzer for recorded exam videos")
+    parser.add_argument("videos", nargs="+", help="video files to analyze")
+    parser.add_argument("--output-dir", default="reports", help="directory for timelines and summaries")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--chunk-seconds", type=float, default=120.0,
+                        help="length of each parallel chunk in seconds")
+    parser.add_argument("--sample-every", type=int, default=1,
+                        help="analyze every Nth frame")
+    parser.add_argument("--mirror", action="store_true",
+                        help="flip frames horizontally like the live detector")
+    parser.add_argument("--alert-threshold", type=float, default=3.0,
+                        help="seconds of invalid frames that count as a violation")
+    args = parser.parse_args()
+
+    print("🚀 Starting Offline Batch Analyzer...")
+    start_time = time.time()
+    analyze_videos(args.videos, args.output_dir, args.workers, args.chunk_seconds,
+                   max(args.sample_every, 1), args.mirror, args.alert_threshold)
+    print(f"🏁 Finished in {time.time() - start_time:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Detection Benchmark
+Replays a fixed frame corpus through AdvancedFaceDetector without a camera
+or window, reports throughput, per-stage latency and peak memory, and
+fails when results regress beyond a stored baseline
+
+Record the baseline once per machine with `python benchmark.py
+--save-baseline` (same corpus options as later runs); it is written to
+benchmark_baseline.json next to this file. Timings only compare on the
+same hardware, so the file is not committed.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+warnings.filterwarnings("ignore")
+
+import cv2
+import numpy as np
+
+from synthetic import draw_face
+
+# Corpus timeline: stability windows see frames 1/30 s apart regardless of speed
+CORPUS_FPS = 30.0
+
+# Machine-specific, see the module docstring (ignored by git)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Helpers timed on their own; landmarks_to_array (every landmark) is the
+# conversion gather_landmarks (analysis landmarks only) replaced by default
+HELPERS = ("landmarks_to_array", "gather_landmarks", "calculate_iris_position", "calculate_iris_positions",
+           "estimate_head_pose", "display_status")
+
+def generate_corpus(num_frames=300, width=640, height=480):
+    """Deterministic procedural clip: head drift, gaze shifts, blinks and absences"""
+    frames = []
+    for i in range(num_frames):
+        t = i / 30.0
+        # Every 10 seconds the candidate leaves the frame for half a second
+        if i % 300 >= 285:
+            frames.append(np.full((height, width, 3), (90, 110, 130), dtype=np.uint8))
+            continue
+        frames.append(draw_face(
+            width, height,
+            dx=25 * np.sin(t * 0.7), dy=10 * np.sin(t * 1.1),
+            gaze=8 * np.sin(t * 0.4), blink=(i % 90) in (40, 41, 42),
+            tilt=4 * np.sin(t * 0.5)
+        ))
+    return frames
+
+def load_clip(path, num_frames):
+    """Read up to num_frames frames from a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise Exception(f"Cannot open clip: {path}")
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def time_calls(func, args_list, repeat=1):
+    """Call func over args_list and return latency stats in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000
+    return {
+        "calls": len(samples),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4)
+    }
+
+def run_benchmark(frames, warmup=10):
+    """Benchmark analyze_frame and its helpers over a corpus"""
+    from app import AdvancedFaceDetector
+
+    report = {"frames": len(frames), "resolution": list(frames[0].shape[1::-1])}
+
+    # Startup: model construction, warm-up and the first real frame after it
+    start = time.perf_counter()
+    detector = AdvancedFaceDetector(headless=True)
+    constructed = time.perf_counter()
+    detector.warm_up(frames[0].shape)
+    warmed = time.perf_counter()
+    ticks = itertools.count()
+    detector.analyze_frame(frames[0], next(ticks) / CORPUS_FPS)
+    report["startup"] = {
+        "construct_ms": round((constructed - start) * 1000, 2),
+        "warm_up_ms": round((warmed - constructed) * 1000, 2),
+        "first_frame_ms": round((time.perf_counter() - warmed) * 1000, 2)
+    }
+
+    # Headless end-to-end analysis
+    for frame in frames[:warmup]:
+        detector.analyze_frame(frame, next(ticks) / CORPUS_FPS)
+    detector.metrics.reset()
+
+    start = time.perf_counter()
+    detected = looking = valid = 0
+    for frame in frames:
+        result, is_valid = detector.analyze_frame(frame, next(ticks) / CORPUS_FPS)
+        detected += result.face_detected
+        looking += result.looking_at_camera
+        valid += is_valid
+    elapsed = time.perf_counter() - start
+
+    report["analyze_frame"] = {
+        "fps": round(len(frames) / elapsed, 2),
+        "ms_per_frame": round(elapsed / len(frames) * 1000, 4),
+        "face_frames": int(detected),
+        "looking_frames": int(looking),
+        "valid_frames": int(valid),
+        "stages": detector.metrics.snapshot()["stages"]
+    }
+
+    # Rendering path as run() does it: mirror, analyze + draw, status overlay
+    renderer = AdvancedFaceDetector(headless=False)
+    render_ticks = itertools.count()
+    for frame in frames[:warmup]:
+        renderer.analyze_frame(renderer.buffers.flip(frame), next(render_ticks) / CORPUS_FPS)
+    renderer.buffers.reset_counters()
+    start = time.perf_counter()
+    for frame in frames:
+        annotated, _ = renderer.analyze_frame(renderer.buffers.flip(frame), next(render_ticks) / CORPUS_FPS)
+        renderer.display_status(annotated)
+    elapsed = time.perf_counter() - start
+    report["analyze_frame_rendered"] = {
+        "fps": round(len(frames) / elapsed, 2),
+        "ms_per_frame": round(elapsed / len(frames) * 1000, 4),
+        "pool_allocations_per_frame": round(renderer.buffers.allocations / len(frames), 4)
+    }
+    copies = [frame.copy() for frame in frames]
+
+    # Individual helpers on the corpus' landmark sets
+    landmark_sets = []
+    landmark_lists = []
+    for frame in frames:
+        points = detector.run_face_mesh(frame)
+        if points is not None:
+            landmark_sets.append((points, frame.shape))
+            landmark_lists.append((detector.face_landmarks,))
+    if landmark_sets:
+        report["landmarks_to_array"] = time_calls(detector.landmarks_to_array, landmark_lists)
+        report["gather_landmarks"] = time_calls(detector.gather_landmarks, landmark_lists)
+        report["calculate_iris_position"] = time_calls(
+            detector.calculate_iris_position,
+            [(points, detector.LEFT_IRIS_INDICES, detector.LEFT_EYE_INDICES) for points, _ in landmark_sets]
+        )
+        report["calculate_iris_positions"] = time_calls(
+            detector.calculate_iris_positions, [(points,) for points, _ in landmark_sets]
+        )
+        report["estimate_head_pose"] = time_calls(
+            detector.estimate_head_pose, [(points, shape) for points, shape in landmark_sets]
+        )
+    report["display_status"] = time_calls(renderer.display_status, [(frame,) for frame in copies])
+
+    # Memory: separate traced pass so tracing overhead never skews timings.
+    # Per-frame transient bytes = peak above the heap level before the call.
+    detector.buffers.reset_counters()
+    transient = []
+    tracemalloc.start()
+    for frame in frames:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        detector.analyze_frame(frame, next(ticks) / CORPUS_FPS)
+        _, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - current)
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # resource is Unix-only; Windows runs report no max RSS
+    try:
+        import resource
+        max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        max_rss_mb = None
+    report["memory"] = {
+        "traced_peak_mb": round(peak_traced / 1e6, 2),
+        "transient_kb_per_frame": round(float(np.mean(transient)) / 1024, 2),
+        "pool_allocations_per_frame": round(detector.buffers.allocations / len(frames), 4),
+        "pool_reuses_per_frame": round(detector.buffers.reuses / len(frames), 4),
+        "max_rss_mb": max_rss_mb
+    }
+    report["environment"] = {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count()
+    }
+    return report
+
+def run_engine_benchmark(frames, model_path, running_mode, warmup=10, blendshapes=False, matrix_pose=False):
+    """Benchmark headless analyze_frame on the FaceLandmarker engine
+
+    In live_stream mode analyze_frame only submits the frame and returns the
+    newest finished result, so its time is what the capture loop pays; the
+    submit-to-result latency and how many results arrived are reported too.
+    """
+    from app import build_detector
+
+    detector = build_detector(headless=True, engine="landmarker", landmarker_model=model_path,
+                              landmarker_mode=running_mode, blendshapes=blendshapes, matrix_pose=matrix_pose)
+    engine = detector.landmark_engine
+    ticks = itertools.count()
+    for frame in frames[:warmup]:
+        detector.analyze_frame(frame, next(ticks) / CORPUS_FPS)
+    detector.metrics.reset()
+    submitted, completed = engine.submitted, engine.completed
+
+    start = time.perf_counter()
+    detected = looking = valid = 0
+    for frame in frames:
+        result, is_valid = detector.analyze_frame(frame, next(ticks) / CORPUS_FPS)
+        detected += result.face_detected
+        looking += result.looking_at_camera
+        valid += is_valid
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "fps": round(len(frames) / elapsed, 2),
+        "ms_per_frame": round(elapsed / len(frames) * 1000, 4),
+        "face_frames": int(detected),
+        "looking_frames": int(looking),
+        "valid_frames": int(valid),
+        "results_per_frame": round((engine.completed - completed) / max(engine.submitted - submitted, 1), 4),
+        "result_latency_ms": round(engine.average_latency * 1000, 3),
+        "stages": detector.metrics.snapshot()["stages"]
+    }
+    engine.close()
+    return report
+
+def compare_to_baseline(report, baseline, tolerance, min_delta_ms=0.05):
+    """Return a list of regressions beyond the tolerance
+
+    Latencies that moved by less than min_delta_ms are ignored so that
+    sub-millisecond stages don't fail on timer noise.
+    """
+    regressions = []
+
+    def check(name, current, previous, higher_is_better=False, absolute_floor=0.0):
+        if previous is None or current is None or previous <= 0:
+            return
+        if abs(current - previous) < absolute_floor:
+            return
+        change = (previous - current) / previous if higher_is_better else (current - previous) / previous
+        if change > tolerance:
+            regressions.append(f"{name}: {previous} -> {current} ({change * 100:+.1f}%)")
+
+    check("analyze_frame fps", report["analyze_frame"]["fps"],
+          baseline.get("analyze_frame", {}).get("fps"), higher_is_better=True)
+    check("analyze_frame_rendered fps", report["analyze_frame_rendered"]["fps"],
+          baseline.get("analyze_frame_rendered", {}).get("fps"), higher_is_better=True)
+    for helper in HELPERS:
+        if helper in report:
+            check(f"{helper} p50", report[helper]["p50_ms"], baseline.get(helper, {}).get("p50_ms"),
+                  absolute_floor=min_delta_ms)
+    for name, stats in report.get("engines", {}).items():
+        check(f"{name} fps", stats["fps"], baseline.get("engines", {}).get(name, {}).get("fps"),
+              higher_is_better=True)
+    for stage, stats in report["analyze_frame"]["stages"].items():
+        previous = baseline.get("analyze_frame", {}).get("stages", {}).get(stage, {})
+        check(f"stage {stage} p50", stats["p50_ms"], previous.get("p50_ms"), absolute_floor=min_delta_ms)
+    check("traced peak memory", report["memory"]["traced_peak_mb"],
+          baseline.get("memory", {}).get("traced_peak_mb"))
+    check("transient heap per frame", report["memory"]["transient_kb_per_frame"],
+          baseline.get("memory", {}).get("transient_kb_per_frame"), absolute_floor=64)
+
+    # Same corpus must produce the same verdicts. The procedural faces never
+    # pass the head-pose check (solvePnP puts their pitch near +-180), so
+    # valid_frames stays 0 there and the gaze count carries the check
+    for key in ("face_frames", "looking_frames", "valid_frames"):
+        previous = baseline.get("analyze_frame", {}).get(key)
+        if previous is not None and previous != report["analyze_frame"][key]:
+            regressions.append(f"{key} changed: {previous} -> {report['analyze_frame'][key]}")
+    return regressions
+
+def print_report(report):
+    """Print a readable benchmark summary"""
+    analysis = report["analyze_frame"]
+    print("=" * 70)
+    print(f"📊 {report['frames']} frames at {report['resolution'][0]}x{report['resolution'][1]}")
+    print(f"⚡ analyze_frame (headless): {analysis['fps']:.1f} FPS, {analysis['ms_per_frame']:.2f} ms/frame "
+          f"({analysis['face_frames']} face, {analysis['looking_frames']} looking, {analysis['valid_frames']} valid)")
+    print(f"🎨 analyze_frame + display_status: {report['analyze_frame_rendered']['fps']:.1f} FPS")
+    startup = report["startup"]
+    print(f"🚀 Startup: construct {startup['construct_ms']:.0f} ms, warm-up {startup['warm_up_ms']:.0f} ms, "
+          f"first frame {startup['first_frame_ms']:.1f} ms")
+    for helper in HELPERS:
+        if helper in report:
+            stats = report[helper]
+            print(f"   {helper:<26} p50 {stats['p50_ms']:.4f} ms  p95 {stats['p95_ms']:.4f} ms")
+    max_rss = report["memory"]["max_rss_mb"]
+    print(f"🧠 Peak traced memory: {report['memory']['traced_peak_mb']:.2f} MB"
+          + (f", max RSS {max_rss:.1f} MB" if max_rss is not None else ""))
+    print(f"♻️  Per frame: {report['memory']['transient_kb_per_frame']:.1f} KB transient heap, "
+          f"{report['memory']['pool_allocations_per_frame']:.3f} pool allocations "
+          f"({report['memory']['pool_reuses_per_frame']:.1f} reuses) headless, "
+          f"{report['analyze_frame_rendered']['pool_allocations_per_frame']:.3f} rendered")
+    for name, stats in report.get("engines", {}).items():
+        print(f"🧩 {name}: {stats['fps']:.1f} FPS, {stats['ms_per_frame']:.2f} ms/frame "
+              f"({stats['face_frames']} face, {stats['looking_frames']} looking, {stats['valid_frames']} valid), "
+              f"{stats['results_per_frame'] * 100:.0f}% results, {stats['result_latency_ms']:.1f} ms to result")
+    print("-" * 70)
+    for stage, stats in analysis["stages"].items():
+        print(f"   {stage:<22} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms")
+    print("=" * 70)
+
+def main():
+    """Run the benchmark and compare against the stored baseline"""
+    parser = argparse.ArgumentParser(description="Reproducible benchmark for AdvancedFaceDetector")
+    parser.add_argument("--frames", type=int, default=300, help="number of corpus frames")
+    parser.add_argument("--clip", help="use frames from this video instead of the procedural corpus")
+    parser.add_argument("--width", type=int, default=640, help="procedural corpus width")
+    parser.add_argument("--height", type=int, default=480, help="procedural corpus height")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression before failing (0.25 = 25%%)")
+    parser.add_argument("--output", help="also write the full report as JSON")
+    parser.add_argument("--landmarker-model",
+                        help="also benchmark the FaceLandmarker engine (VIDEO and LIVE_STREAM) with this .task file")
+    parser.add_argument("--blendshapes", action="store_true", help="enable blendshapes for the FaceLandmarker runs")
+    parser.add_argument("--matrix-pose", action="store_true",
+                        help="use the transformation matrix for head pose in the FaceLandmarker runs")
+    args = parser.parse_args()
+
+    if args.clip:
+        frames = load_clip(args.clip, args.frames)
+    else:
+        frames = generate_corpus(args.frames, args.width, args.height)
+    if not frames:
+        print("❌ Empty frame corpus")
+        return 2
+
+    report = run_benchmark(frames)
+    if args.landmarker_model:
+        report["engines"] = {
+            f"landmarker_{mode}": run_engine_benchmark(frames, args.landmarker_model, mode,
+                                                       blendshapes=args.blendshapes, matrix_pose=args.matrix_pose)
+            for mode in ("video", "live_stream")
+        }
+    report["corpus"] = args.clip or f"procedural:{args.frames}@{args.width}x{args.height}"
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("corpus") != report["corpus"]:
+        print(f"⚠ Baseline corpus {baseline.get('corpus')} differs from {report['corpus']}, not comparing")
+        return 0
+
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print("❌ Regressions beyond baseline:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+
+    print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
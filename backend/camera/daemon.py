@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Pre-forked Detector Daemon
+Keeps warmed detectors waiting so a new exam session starts analyzing in
+milliseconds. The parent imports the heavy modules once; every forked child
+builds and warms its own detector and then blocks in accept() on the shared
+socket. Whichever child accepts a session serves it, and the parent forks a
+replacement right away
+
+Protocol (unix socket): the client sends one JSON line such as
+{"session": "abc", "source": 0, "evidence_dir": "evidence/abc",
+"latency_budget_ms": 100, "multi_face_interval": 15,
+"telemetry_dir": "telemetry/abc", "landmark_cache_dir": "landmarks/abc"} and reads
+NDJSON back: a {"type": "session"} handoff record, then the batched state and
+violation records of ResultStreamer. Closing the connection ends the session
+"""
+
+import argparse
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import threading
+import time
+import warnings
+warnings.filterwarnings("ignore")
+
+# Child -> parent notices over a pipe: pid and kind (writes this small are atomic)
+NOTICE = struct.Struct(">Ib")
+READY, BUSY = 0, 1
+
+def open_session(socket_path, request):
+    """Client side: start a session and return (socket, reader, handoff record)"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+    reader = sock.makefile("rb")
+    return sock, reader, json.loads(reader.readline())
+
+def serve_session(detector, conn, accepted, startup):
+    """Run one session on an accepted connection until the client or source ends it"""
+    from adaptive import AdaptiveQualityController
+    from evidence import EvidenceRecorder
+    from metrics import StartupTimer
+    from multiface import MultiFaceMonitor
+    from rescoring import LandmarkCache, Thresholds
+    from streaming import ResultStreamer
+    from telemetry import TelemetryLog
+
+    reader = conn.makefile("rb")
+    writer = conn.makefile("wb")
+    request = json.loads(reader.readline() or b"{}")
+    session_id = request.get("session")
+
+    source = request.get("source", 0)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+
+    evidence = None
+    if request.get("evidence_dir"):
+        evidence = EvidenceRecorder(request["evidence_dir"], pre_roll=request.get("pre_roll", 5.0),
+                                    post_roll=request.get("post_roll", 3.0))
+
+    quality = None
+    if request.get("latency_budget_ms"):
+        quality = AdaptiveQualityController(latency_budget=request["latency_budget_ms"] / 1000)
+
+    multi_face = None
+    if request.get("multi_face_interval"):
+        multi_face = MultiFaceMonitor(interval_frames=request["multi_face_interval"])
+
+    telemetry = None
+    if request.get("telemetry_dir"):
+        telemetry = TelemetryLog(request["telemetry_dir"])
+
+    landmark_cache = None
+    if request.get("landmark_cache_dir"):
+        landmark_cache = LandmarkCache(request["landmark_cache_dir"], attributes={
+            "thresholds": Thresholds.from_detector(detector).to_dict(),
+            "windows": {name: window.seconds for name, window in detector.stability.windows.items()}
+        })
+
+    # The client closing its end is the stop signal
+    stop_event = threading.Event()
+
+    def watch_client():
+        while reader.read(4096):
+            pass
+        stop_event.set()
+
+    threading.Thread(target=watch_client, name="session-watch", daemon=True).start()
+
+    # SIGTERM from the daemon ends the session like a closing client; unlike a
+    # second SIGINT it can't land in the middle of the summary and cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    handoff = {
+        "type": "session",
+        "session": session_id,
+        "pid": os.getpid(),
+        "handoff_ms": round((time.perf_counter() - accepted) * 1000, 2),
+        "warm_startup_ms": startup.to_dict()
+    }
+    writer.write((json.dumps(handoff, separators=(",", ":")) + "\n").encode("utf-8"))
+    writer.flush()
+    print(f"🔗 Session {session_id} handed to pid {os.getpid()} in {handoff['handoff_ms']:.1f} ms")
+
+    # The session's own startup (camera, first verdict) is timed from the handoff
+    streamer = ResultStreamer(f"session {session_id}", session_id=session_id).attach(writer)
+    detector.run(streamer=streamer, evidence=evidence, startup=StartupTimer(origin=accepted),
+                 camera_id=source, stop_event=stop_event, quality=quality,
+                 multi_face=multi_face, telemetry=telemetry, landmark_cache=landmark_cache)
+
+def child_main(listener, notify_fd, options):
+    """Forked child: warm a detector, wait for one session, serve it"""
+    from app import build_detector
+    from metrics import StartupTimer
+
+    startup = StartupTimer()
+    detector = build_detector(headless=True, **options)
+    startup.mark("models")
+    detector.warm_up()
+    startup.mark("warm_up")
+    os.write(notify_fd, NOTICE.pack(os.getpid(), READY))
+
+    conn, _ = listener.accept()
+    accepted = time.perf_counter()
+    os.write(notify_fd, NOTICE.pack(os.getpid(), BUSY))
+    listener.close()
+
+    try:
+        serve_session(detector, conn, accepted, startup)
+    finally:
+        conn.close()
+
+class DetectorDaemon:
+    """Pre-fork pool that always keeps pool_size warmed detectors idle"""
+    def __init__(self, socket_path, pool_size=2, detector_options=None, shutdown_timeout=10.0):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.detector_options = detector_options or {}
+        self.shutdown_timeout = shutdown_timeout
+
+        self.listener = None
+        self.notify_r = None
+        self.notify_w = None
+
+        # Child pids by state
+        self.warming = set()
+        self.idle = set()
+        self.busy = set()
+        self.stopping = False
+
+        # Statistics
+        self.start_time = time.time()
+        self.children_forked = 0
+        self.sessions_started = 0
+        self.warm_up_failures = 0
+
+    def preload(self):
+        """Import everything a child needs, once, so every fork starts with it"""
+        start = time.perf_counter()
+        import mediapipe
+        import app
+        import adaptive
+        import evidence
+        import multiface
+        import rescoring
+        import streaming
+        import telemetry
+        if self.detector_options.get("engine") == "landmarker":
+            import landmarker
+        print(f"✓ Modules preloaded in {time.perf_counter() - start:.2f}s")
+
+    def spawn(self):
+        """Fork one child that warms a detector and waits for a session"""
+        pid = os.fork()
+        if pid == 0:
+            os.close(self.notify_r)
+            code = 0
+            try:
+                child_main(self.listener, self.notify_w, self.detector_options)
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"\n❌ Detector process {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                # Never fall back into the parent's loop
+                os._exit(code)
+
+        self.children_forked += 1
+        self.warming.add(pid)
+
+    def handle_notices(self):
+        """Track children becoming ready or busy; replace every busy one"""
+        data = os.read(self.notify_r, NOTICE.size * 64)
+        for offset in range(0, len(data), NOTICE.size):
+            pid, kind = NOTICE.unpack_from(data, offset)
+            if kind == READY and pid in self.warming:
+                self.warming.discard(pid)
+                self.idle.add(pid)
+            elif kind == BUSY:
+                self.idle.discard(pid)
+                self.busy.add(pid)
+                self.sessions_started += 1
+                if not self.stopping:
+                    self.spawn()
+
+    def reap(self):
+        """Collect exited children; replace idle ones that died unexpectedly"""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            if self.stopping:
+                for children in (self.warming, self.idle, self.busy):
+                    children.discard(pid)
+            elif pid in self.warming:
+                # A detector that cannot warm up would fail again; don't fork-loop
+                self.warming.discard(pid)
+                self.warm_up_failures += 1
+                print(f"\n⚠ Detector process {pid} exited while warming up")
+            elif pid in self.idle:
+                self.idle.discard(pid)
+                self.spawn()
+            else:
+                self.busy.discard(pid)
+
+    def serve(self):
+        """Preload, fork the pool and keep it topped up until interrupted"""
+        self.preload()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(64)
+        self.notify_r, self.notify_w = os.pipe()
+
+        for _ in range(self.pool_size):
+            self.spawn()
+        print(f"✓ Listening on unix socket {self.socket_path} with {self.pool_size} warmed detectors")
+
+        while True:
+            readable, _, _ = select.select([self.notify_r], [], [], 1.0)
+            if readable:
+                self.handle_notices()
+            self.reap()
+
+    def shutdown(self):
+        """Stop idle children, let running sessions finish, print a summary"""
+        self.stopping = True
+        if self.notify_r is not None and select.select([self.notify_r], [], [], 0)[0]:
+            # Sessions accepted just before the interrupt must be treated as busy
+            self.handle_notices()
+        if self.listener is not None:
+            self.listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+        for pid in self.warming | self.idle:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # Running sessions close their streams and write their summaries. A
+        # Ctrl+C from the terminal already reached them; SIGTERM only sets
+        # their stop event, so it is safe to send either way
+        for pid in self.busy:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.time() + self.shutdown_timeout
+        try:
+            while (self.warming or self.idle or self.busy) and time.time() < deadline:
+                self.reap()
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            print("\n⚠ Interrupted again, killing running sessions")
+        for pid in self.warming | self.idle | self.busy:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        elapsed = time.time() - self.start_time
+        print("\n\n" + "=" * 70)
+        print("🏁 DETECTOR DAEMON SUMMARY")
+        print("=" * 70)
+        print(f"🔗 Sessions Served: {self.sessions_started:,}")
+        print(f"🍴 Detector Processes Forked: {self.children_forked:,}")
+        if self.warm_up_failures:
+            print(f"⚠️  Warm-up Failures: {self.warm_up_failures:,}")
+        print(f"⏱️  Uptime: {elapsed:.1f} seconds")
+        print("=" * 70)
+
+def main():
+    """Run the detector daemon"""
+    from app import add_detector_arguments, detector_options
+
+    parser = argparse.ArgumentParser(description="Pre-forked daemon of warmed face detectors")
+    parser.add_argument("--socket", default="/tmp/face-detector.sock", help="unix socket to listen on")
+    parser.add_argument("--pool-size", type=int, default=2, help="warmed detectors kept waiting for sessions")
+    add_detector_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 Starting Detector Daemon...")
+    daemon = DetectorDaemon(args.socket, pool_size=args.pool_size, detector_options=detector_options(args))
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        print("\n\n🛑 Shutting down gracefully...")
+    finally:
+        daemon.shutdown()
+
+if __name__ == "__main__":
+    main()
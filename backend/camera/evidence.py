@@ -0,0 +1,192 @@
+"""
+Violation Evidence Recorder
+Keeps a bounded, JPEG-compressed pre-roll of recent frames and, when a
+sustained violation starts, writes a short clip plus a JSON sidecar of the
+per-frame metrics. Encoding and file I/O run on background threads so the
+detection loop only pays for a frame copy
+"""
+
+import json
+import os
+import queue
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+class EvidenceRecorder:
+    """Pre-roll ring of encoded frames and asynchronous clip writer"""
+    def __init__(self, output_dir="evidence", pre_roll=5.0, post_roll=3.0, fps=15.0,
+                 jpeg_quality=80, max_bytes=64 * 1024 * 1024, max_queue=8, codec="MJPG", marker_timeout=0.05):
+        self.output_dir = output_dir
+
+        # Clip window around the moment the violation was raised
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+
+        # Frames are sampled at this rate, whatever the detection FPS
+        self.fps = fps
+        self.sample_interval = 1.0 / fps
+        self.last_sample = None
+
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.max_bytes = max_bytes
+        self.codec = codec
+
+        # Encoder thread state: (timestamp, jpeg, metrics) ring and open captures
+        self.ring = deque()
+        self.ring_bytes = 0
+        self.captures = []
+
+        self.frame_queue = queue.Queue(maxsize=max_queue)
+        self.write_queue = queue.Queue()
+
+        # Longest a violation marker waits for a full queue (seconds)
+        self.marker_timeout = marker_timeout
+        self.encoder_thread = None
+        self.writer_thread = None
+
+        # Statistics
+        self.sampled_frames = 0
+        self.dropped_frames = 0
+        self.dropped_clips = 0
+        self.clips_written = 0
+        self.last_clip = None
+
+    def start(self):
+        """Start the encoder and writer threads"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.encoder_thread = threading.Thread(target=self._encoder_loop, name="evidence-encoder", daemon=True)
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="evidence-writer", daemon=True)
+        self.encoder_thread.start()
+        self.writer_thread.start()
+        return self
+
+    def add_frame(self, frame, timestamp, result):
+        """Offer a frame for the pre-roll (cheap: a sampled copy and a queue put)"""
+        if self.last_sample is not None and timestamp - self.last_sample < self.sample_interval:
+            return
+        self.last_sample = timestamp
+
+        metrics = result.to_dict()
+        metrics["timestamp"] = round(timestamp, 3)
+        try:
+            # Frame buffers are reused by the loop, so the encoder gets its own copy
+            self.frame_queue.put_nowait(("frame", timestamp, frame.copy(), metrics))
+            self.sampled_frames += 1
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def on_violation(self, event):
+        """StabilityTracker subscriber: capture a clip around each violation start"""
+        if event.kind != "start":
+            return
+        # Markers may wait briefly for the encoder, unlike frames, but must not stall detection
+        try:
+            self.frame_queue.put(("capture", event.timestamp, None, event), timeout=self.marker_timeout)
+        except queue.Full:
+            self.dropped_clips += 1
+            print(f"\n⚠ Evidence encoder busy, no clip for the violation at {event.timestamp:.1f}")
+
+    def _encoder_loop(self):
+        """Compress sampled frames into the ring and cut clips once post-roll is in"""
+        while True:
+            item = self.frame_queue.get()
+            if item is None:
+                break
+
+            kind, timestamp, frame, payload = item
+            if kind == "capture":
+                self.captures.append((timestamp - self.pre_roll, timestamp + self.post_roll, payload))
+                continue
+
+            ok, jpeg = cv2.imencode(".jpg", frame, self.encode_params)
+            if not ok:
+                continue
+            self.ring.append((timestamp, jpeg, payload))
+            self.ring_bytes += jpeg.nbytes
+
+            # Keep enough history for the pre-roll of a clip still being collected
+            horizon = min([start for start, _, _ in self.captures], default=timestamp - self.pre_roll)
+            while self.ring and (self.ring[0][0] < horizon or self.ring_bytes > self.max_bytes):
+                self.ring_bytes -= self.ring.popleft()[1].nbytes
+
+            self._cut_clips(timestamp)
+
+        # Shutting down: save whatever the open captures have
+        self._cut_clips(float("inf"))
+        self.write_queue.put(None)
+
+    def _cut_clips(self, now):
+        """Hand every capture whose post-roll has elapsed to the writer"""
+        remaining = []
+        for start, end, event in self.captures:
+            if now < end:
+                remaining.append((start, end, event))
+                continue
+            frames = [entry for entry in self.ring if start <= entry[0] <= end]
+            if frames:
+                self.write_queue.put((event, frames))
+        self.captures = remaining
+
+    def _writer_loop(self):
+        """Decode and write clips and sidecars off the detection thread"""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            event, frames = item
+            try:
+                self.write_clip(event, frames)
+            except (OSError, cv2.error) as e:
+                print(f"\n⚠ Could not write evidence clip: {e}")
+
+    def write_clip(self, event, frames):
+        """Write <name>.avi and <name>.json for one violation"""
+        name = f"violation_{int(event.timestamp * 1000)}"
+        clip_path = os.path.join(self.output_dir, f"{name}.avi")
+        sidecar_path = os.path.join(self.output_dir, f"{name}.json")
+
+        # Play back at the rate frames were actually sampled, so the clip runs in real time
+        span = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / span if span > 0 else self.fps
+
+        first = cv2.imdecode(frames[0][1], cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        writer = cv2.VideoWriter(clip_path, cv2.VideoWriter_fourcc(*self.codec), fps, (width, height))
+        try:
+            for index, (_, jpeg, _) in enumerate(frames):
+                image = first if index == 0 else cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+                if image.shape[:2] != (height, width):
+                    image = cv2.resize(image, (width, height))
+                writer.write(image)
+        finally:
+            writer.release()
+
+        with open(sidecar_path, "w") as f:
+            json.dump({
+                "event": event.to_dict(),
+                "clip": os.path.basename(clip_path),
+                "fps": round(fps, 2),
+                "pre_roll": self.pre_roll,
+                "post_roll": self.post_roll,
+                "frames": [metrics for _, _, metrics in frames]
+            }, f, indent=2, default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+
+        self.clips_written += 1
+        self.last_clip = clip_path
+
+    @property
+    def buffered_seconds(self):
+        """Time span currently held in the pre-roll ring"""
+        return self.ring[-1][0] - self.ring[0][0] if len(self.ring) > 1 else 0.0
+
+    def stop(self, timeout=10.0):
+        """Flush open captures, then stop both threads"""
+        if self.encoder_thread is None:
+            return
+        self.frame_queue.put(None)
+        self.encoder_thread.join(timeout)
+        self.writer_thread.join(timeout)
+        self.encoder_thread = None
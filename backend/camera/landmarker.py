@@ -0,0 +1,175 @@
+"""
+FaceLandmarker Engine
+MediaPipe Tasks FaceLandmarker as an alternative to the legacy Face Mesh
+solution. LIVE_STREAM mode submits frames with detect_async and picks up
+results from the callback, so the calling loop never waits for inference;
+VIDEO mode runs synchronously for reproducible offline analysis
+"""
+
+import threading
+import time
+
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks.python import BaseOptions
+from mediapipe.tasks.python import vision
+
+RUNNING_MODES = {
+    "live_stream": vision.RunningMode.LIVE_STREAM,
+    "video": vision.RunningMode.VIDEO,
+}
+
+class LandmarkerOutput:
+    """One FaceLandmarker result for the first face"""
+    __slots__ = ("points", "transformation_matrix", "blendshapes", "timestamp_ms")
+
+    def __init__(self, points, transformation_matrix, blendshapes, timestamp_ms):
+        self.points = points
+        self.transformation_matrix = transformation_matrix
+        self.blendshapes = blendshapes
+        self.timestamp_ms = timestamp_ms
+
+class FaceLandmarkerEngine:
+    """Timestamped FaceLandmarker inference with the latest result always at hand"""
+    def __init__(self, model_path, running_mode="live_stream", blendshapes=False,
+                 transformation_matrix=False, max_result_age=0.5, min_confidence=0.7):
+        if running_mode not in RUNNING_MODES:
+            raise ValueError(f"Unknown running mode '{running_mode}', choose from {', '.join(RUNNING_MODES)}")
+        self.running_mode = running_mode
+        self.live = running_mode == "live_stream"
+        self.blendshapes = blendshapes
+        self.transformation_matrix = transformation_matrix
+
+        # Async results older than this (seconds) no longer describe the frame
+        self.max_result_age = max_result_age
+
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=RUNNING_MODES[running_mode],
+            num_faces=1,
+            min_face_detection_confidence=min_confidence,
+            min_face_presence_confidence=min_confidence,
+            min_tracking_confidence=min_confidence,
+            output_face_blendshapes=blendshapes,
+            output_facial_transformation_matrixes=transformation_matrix,
+            result_callback=self._on_result if self.live else None
+        )
+        self.landmarker = vision.FaceLandmarker.create_from_options(options)
+
+        # Latest completed result, written by the callback thread
+        self.lock = threading.Lock()
+        self.latest = None
+        self.latest_time = 0.0
+        self.last_timestamp_ms = -1
+        
+        # VIDEO mode: shift applied to the caller's timeline after it restarted
+        self.timeline_offset_ms = 0
+
+        # Submission time per pending timestamp, for result latency
+        self.pending = {}
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+
+    def next_timestamp(self, timestamp):
+        """Strictly increasing millisecond timestamp, as the task graph requires
+
+        A timeline that jumps backwards (the next video, or real frames after
+        warm-up on another clock) is shifted to continue right after the last
+        timestamp, so frame spacing is kept instead of collapsing to 1 ms steps.
+        """
+        timestamp_ms = int(timestamp * 1000) + self.timeline_offset_ms
+        if timestamp_ms <= self.last_timestamp_ms:
+            self.timeline_offset_ms += self.last_timestamp_ms + 1 - timestamp_ms
+            timestamp_ms = self.last_timestamp_ms + 1
+        self.last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def convert(self, result, timestamp_ms):
+        """LandmarkerOutput for the first face, or None when no face was found"""
+        if not result.face_landmarks:
+            return None
+
+        landmarks = result.face_landmarks[0]
+        points = np.fromiter(
+            (value for landmark in landmarks for value in (landmark.x, landmark.y, landmark.z)),
+            dtype=np.float32, count=len(landmarks) * 3
+        ).reshape(-1, 3)
+
+        matrix = None
+        if result.facial_transformation_matrixes:
+            matrix = np.asarray(result.facial_transformation_matrixes[0], dtype=np.float64)
+
+        blendshapes = None
+        if result.face_blendshapes:
+            blendshapes = {category.category_name: round(float(category.score), 4)
+                           for category in result.face_blendshapes[0]}
+
+        return LandmarkerOutput(points, matrix, blendshapes, timestamp_ms)
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback (runs on a MediaPipe thread)"""
+        output = self.convert(result, timestamp_ms)
+        now = time.perf_counter()
+        with self.lock:
+            submitted = self.pending.pop(timestamp_ms, None)
+            # Frames dropped by the graph never call back; forget older entries
+            for stale in [ts for ts in self.pending if ts < timestamp_ms]:
+                del self.pending[stale]
+            self.latest = output
+            self.latest_time = now
+            self.completed += 1
+            if submitted is not None:
+                self.last_latency = now - submitted
+                self.total_latency += self.last_latency
+
+    def detect(self, rgb_image, timestamp):
+        """Landmarks for this frame (VIDEO) or the newest finished frame (LIVE_STREAM)
+
+        rgb_image is copied into the MediaPipe image, so the caller may
+        reuse its buffer right away. VIDEO mode follows the caller's timeline;
+        LIVE_STREAM stamps frames on the monotonic clock at submission, since
+        callers mix clocks (wall time, capture perf_counter).
+        """
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_image)
+        timestamp_ms = self.next_timestamp(timestamp if not self.live else time.perf_counter())
+        self.submitted += 1
+
+        if not self.live:
+            start = time.perf_counter()
+            output = self.convert(self.landmarker.detect_for_video(image, timestamp_ms), timestamp_ms)
+            self.last_latency = time.perf_counter() - start
+            self.total_latency += self.last_latency
+            self.completed += 1
+            return output
+
+        with self.lock:
+            self.pending[timestamp_ms] = time.perf_counter()
+        self.landmarker.detect_async(image, timestamp_ms)
+
+        with self.lock:
+            if self.latest is None or time.perf_counter() - self.latest_time > self.max_result_age:
+                return None
+            return self.latest
+
+    def reset_statistics(self):
+        """Forget the latest result and zero the counters (e.g. after warm-up)"""
+        with self.lock:
+            self.latest = None
+            self.pending.clear()
+            self.submitted = 0
+            self.completed = 0
+            self.last_latency = 0.0
+            self.total_latency = 0.0
+
+    @property
+    def average_latency(self):
+        """Mean submit-to-result time in seconds"""
+        return self.total_latency / self.completed if self.completed else 0.0
+
+    def close(self):
+        """Release the task graph"""
+        self.landmarker.close()
@@ -0,0 +1,226 @@
+"""
+Detection Loop Metrics
+Rolling per-stage latency percentiles with Prometheus/JSON export over a
+small HTTP endpoint
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+class LatencyWindow:
+    """Fixed-size ring of the most recent samples for one stage"""
+    def __init__(self, size=1024):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.filled = 0
+
+        # Lifetime totals
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Record one sample"""
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.filled = min(self.filled + 1, len(self.samples))
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self):
+        """Percentiles over the window plus lifetime totals, in milliseconds"""
+        recent = self.samples[:self.filled]
+        if not self.filled:
+            p50 = p95 = p99 = mean = 0.0
+        else:
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000
+            mean = recent.mean() * 1000
+        return {
+            "count": self.count,
+            "mean_ms": round(float(mean), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(self.max * 1000, 3),
+            "total_s": round(self.total, 3)
+        }
+
+class StageMetrics:
+    """Per-stage latency windows, gauges and counters for the detection loop"""
+    def __init__(self, window=1024):
+        self.window = window
+        self.stages = {}
+        self.gauges = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Add a latency sample to a stage"""
+        window = self.stages.get(stage)
+        if window is None:
+            with self.lock:
+                window = self.stages.setdefault(stage, LatencyWindow(self.window))
+        window.add(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """Time the enclosed block as one sample of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def set_gauge(self, name, value):
+        """Publish a point-in-time value (dropped frames, keyframe rate, ...)"""
+        self.gauges[name] = value
+
+    def set_counter(self, name, value):
+        """Publish a running total that only grows until a reset (name ends in _total)"""
+        self.counters[name] = value
+
+    def rate(self, stage):
+        """Events per second implied by a stage's recent mean duration"""
+        window = self.stages.get(stage)
+        if window is None or not window.filled:
+            return 0.0
+        mean = window.samples[:window.filled].mean()
+        return 1.0 / mean if mean > 0 else 0.0
+
+    def reset(self):
+        """Clear all stages, gauges and counters"""
+        with self.lock:
+            self.stages = {}
+            self.gauges = {}
+            self.counters = {}
+
+    def snapshot(self):
+        """Dict of stage percentiles, gauges and counters"""
+        with self.lock:
+            stages = dict(self.stages)
+        return {
+            "stages": {name: window.snapshot() for name, window in stages.items()},
+            "gauges": dict(self.gauges),
+            "counters": dict(self.counters)
+        }
+
+    def to_json(self):
+        """JSON export"""
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix="face_detector"):
+        """Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_latency_seconds Rolling per-stage latency quantiles",
+            f"# TYPE {prefix}_stage_latency_seconds summary"
+        ]
+        for stage, stats in snapshot["stages"].items():
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{prefix}_stage_latency_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                             f'{stats[key] / 1000:.6f}')
+            lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+            lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        for name, value in snapshot["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {float(value):.6f}")
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {float(value):.6f}")
+        return "\n".join(lines) + "\n"
+
+    def format_table(self):
+        """Human-readable per-stage table for the session summary"""
+        snapshot = self.snapshot()["stages"]
+        lines = [f"{'Stage':<22}{'Count':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for stage, stats in snapshot.items():
+            lines.append(f"{stage:<22}{stats['count']:>9}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                         f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+        return "\n".join(lines)
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase, from process start to the first verdict"""
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.last = self.origin
+        self.phases = []
+
+    def mark(self, phase):
+        """Close a phase: everything since the previous mark is attributed to it"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    @property
+    def total(self):
+        """Seconds from the origin to the latest mark"""
+        return self.last - self.origin
+
+    def to_dict(self):
+        """Phase durations in milliseconds"""
+        phases = {phase: round(seconds * 1000, 1) for phase, seconds in self.phases}
+        phases["total"] = round(self.total * 1000, 1)
+        return phases
+
+    def publish(self, metrics):
+        """Expose the phases as gauges on a StageMetrics"""
+        for phase, seconds in self.phases:
+            metrics.set_gauge(f"startup_{phase}_seconds", round(seconds, 4))
+        metrics.set_gauge("startup_total_seconds", round(self.total, 4))
+
+    def format_line(self):
+        """One-line summary, e.g. 'imports 0.81s, models 0.43s, ... = 2.10s'"""
+        parts = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+        return f"{parts} = {self.total:.2f}s"
+
+class MetricsServer:
+    """Background HTTP endpoint serving /metrics (Prometheus) and /metrics.json"""
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        """Start serving on a daemon thread"""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = metrics.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # Keep the terminal status line clean
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the endpoint"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
@@ -0,0 +1,161 @@
+"""
+Multiple-Person Check
+Runs MediaPipe's lightweight face detection model on a downscaled copy of
+every Nth frame in a background thread, alongside the single-face mesh.
+Reports the number of people in view and raises events while more than one
+face is visible; the detection loop only pays for an occasional frame copy
+"""
+
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+import cv2
+
+@dataclass
+class MultipleFacesEvent:
+    """Start or end of a period with more than one face in view"""
+    kind: str               # "start" or "stop"
+    timestamp: float        # capture time of the check that raised the event
+    count: int              # faces found by that check
+
+    def to_dict(self):
+        """Plain dict representation for logging or serialization"""
+        return asdict(self)
+
+class MultiFaceMonitor:
+    """Low-rate background face counter with hysteresis on the verdict"""
+    def __init__(self, interval_frames=15, width=320, min_confidence=0.5, model_selection=0,
+                 confirm_checks=2, metrics=None):
+        # Cost knobs: how often a frame is checked and at what width
+        self.interval_frames = interval_frames
+        self.width = width
+        self.min_confidence = min_confidence
+        self.model_selection = model_selection
+
+        # Consecutive checks that must agree before an event is raised
+        self.confirm_checks = confirm_checks
+        self.metrics = metrics
+
+        # Single-slot handoff to the worker (a busy worker means the frame is skipped)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.running = False
+        self.thread = None
+        self.frames_seen = 0
+
+        # Latest verdict, written by the worker
+        self.person_count = 0
+        self.streak = 0
+        self.multiple = False
+        self.events = []
+
+        self.subscribers = []
+
+        # Statistics
+        self.checks = 0
+        self.skipped_checks = 0
+        self.max_count = 0
+        self.total_time = 0.0
+        self.event_count = 0
+
+    def subscribe(self, callback):
+        """Call callback(MultipleFacesEvent) on the detection loop's thread"""
+        self.subscribers.append(callback)
+
+    def start(self):
+        """Start the worker thread (the model loads there)"""
+        self.running = True
+        self.thread = threading.Thread(target=self._worker_loop, name="multi-face", daemon=True)
+        self.thread.start()
+        return self
+
+    def offer(self, frame, timestamp):
+        """Hand every Nth frame to the worker and deliver finished events"""
+        if self.events:
+            with self.condition:
+                events, self.events = self.events, []
+            for event in events:
+                for callback in self.subscribers:
+                    callback(event)
+
+        self.frames_seen += 1
+        if self.frames_seen % self.interval_frames:
+            return
+        with self.condition:
+            if self.pending is not None:
+                self.skipped_checks += 1
+                return
+            # The loop reuses its buffers, so the worker gets its own copy
+            self.pending = (frame.copy(), timestamp)
+            self.condition.notify()
+
+    def _worker_loop(self):
+        """Count faces on downscaled frames until stopped"""
+        import mediapipe as mp
+        detector = mp.solutions.face_detection.FaceDetection(
+            model_selection=self.model_selection,
+            min_detection_confidence=self.min_confidence
+        )
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                    if not self.running:
+                        break
+                    frame, timestamp = self.pending
+
+                start = time.perf_counter()
+                height, width = frame.shape[:2]
+                if width > self.width:
+                    frame = cv2.resize(frame, (self.width, int(height * self.width / width)),
+                                       interpolation=cv2.INTER_AREA)
+                results = detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                count = len(results.detections or ())
+                elapsed = time.perf_counter() - start
+
+                self.checks += 1
+                self.total_time += elapsed
+                if self.metrics:
+                    self.metrics.record("multi_face", elapsed)
+                self.update(count, timestamp)
+
+                # Release the slot only now, so checks never queue up
+                with self.condition:
+                    self.pending = None
+        finally:
+            detector.close()
+
+    def update(self, count, timestamp):
+        """Advance the multiple-faces state with one check"""
+        self.person_count = count
+        self.max_count = max(self.max_count, count)
+
+        # Count agreeing checks in a row before flipping the verdict
+        if (count > 1) != self.multiple:
+            self.streak += 1
+        else:
+            self.streak = 0
+        if self.streak < self.confirm_checks:
+            return
+
+        self.multiple = not self.multiple
+        self.streak = 0
+        event = MultipleFacesEvent("start" if self.multiple else "stop", timestamp, count)
+        if self.multiple:
+            self.event_count += 1
+        with self.condition:
+            self.events.append(event)
+
+    @property
+    def average_time(self):
+        """Mean seconds per check"""
+        return self.total_time / self.checks if self.checks else 0.0
+
+    def stop(self):
+        """Stop the worker thread"""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2.0)
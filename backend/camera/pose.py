@@ -0,0 +1,169 @@
+"""
+Head Pose Estimation
+solvePnP-based pitch/yaw/roll from six facial landmarks, with cached camera
+intrinsics, warm-started solves and per-call timing
+"""
+
+import json
+import math
+import time
+
+import cv2
+import numpy as np
+
+# 3D model points (in mm, approximate head dimensions)
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),           # Nose tip
+    (0.0, -63.6, -12.5),       # Chin
+    (-43.3, 32.7, -26.0),      # Left eye left corner
+    (43.3, 32.7, -26.0),       # Right eye right corner
+    (-28.9, -28.9, -24.1),     # Left mouth corner
+    (28.9, -28.9, -24.1)       # Right mouth corner
+], dtype=np.float64)
+
+SOLVERS = {
+    "iterative": cv2.SOLVEPNP_ITERATIVE,
+    "epnp": cv2.SOLVEPNP_EPNP,
+    "sqpnp": cv2.SOLVEPNP_SQPNP,
+}
+
+class HeadPoseEstimator:
+    """Reusable head-pose solver for one video stream"""
+    def __init__(self, solver="iterative", warm_start=True, calibration_file=None):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solvePnP solver '{solver}', choose from {', '.join(SOLVERS)}")
+        self.solver = solver
+        self.flags = SOLVERS[solver]
+
+        # Only the iterative solver can refine from an initial guess
+        self.warm_start = warm_start and solver == "iterative"
+
+        # Calibrated intrinsics, rescaled to whatever resolution is analyzed
+        self.calibration = self.load_calibration(calibration_file) if calibration_file else None
+        self.intrinsics_cache = {}
+
+        # Preallocated per-call buffers
+        self.image_points = np.zeros((len(MODEL_POINTS), 2), dtype=np.float64)
+        self.rotation_vector = np.zeros((3, 1), dtype=np.float64)
+        self.translation_vector = np.zeros((3, 1), dtype=np.float64)
+        self.has_guess = False
+
+        # Timing
+        self.last_time = 0.0
+        self.total_time = 0.0
+        self.calls = 0
+
+    @staticmethod
+    def load_calibration(path):
+        """Load camera_matrix, dist_coeffs and the calibrated resolution
+
+        Accepts a JSON file or an .npz archive with the keys camera_matrix,
+        dist_coeffs and optionally width/height.
+        """
+        if path.endswith(".npz"):
+            data = dict(np.load(path))
+        else:
+            with open(path) as f:
+                data = json.load(f)
+
+        camera_matrix = np.asarray(data["camera_matrix"], dtype=np.float64).reshape(3, 3)
+        dist_coeffs = np.asarray(data.get("dist_coeffs", np.zeros(4)), dtype=np.float64).reshape(-1, 1)
+        width = int(data["width"]) if "width" in data else None
+        height = int(data["height"]) if "height" in data else None
+        return camera_matrix, dist_coeffs, width, height
+
+    def intrinsics(self, frame_shape):
+        """Camera matrix and distortion for a resolution, built once and cached"""
+        h, w = frame_shape[:2]
+        key = (w, h)
+        cached = self.intrinsics_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if self.calibration is not None:
+            camera_matrix, dist_coeffs, calib_w, calib_h = self.calibration
+            camera_matrix = camera_matrix.copy()
+            if calib_w and calib_h:
+                # Scale focal lengths and principal point to this resolution
+                camera_matrix[0] *= w / calib_w
+                camera_matrix[1] *= h / calib_h
+                camera_matrix[2] = (0, 0, 1)
+        else:
+            # Approximate pinhole camera: focal length = image width
+            focal_length = w
+            camera_matrix = np.array([
+                [focal_length, 0, w / 2],
+                [0, focal_length, h / 2],
+                [0, 0, 1]
+            ], dtype=np.float64)
+            dist_coeffs = np.zeros((4, 1))
+
+        cached = (camera_matrix, dist_coeffs)
+        self.intrinsics_cache[key] = cached
+        return cached
+
+    def reset(self):
+        """Drop the warm-start guess (e.g. after the face was lost)"""
+        self.has_guess = False
+
+    def reset_statistics(self):
+        """Zero the timing statistics"""
+        self.last_time = 0.0
+        self.total_time = 0.0
+        self.calls = 0
+
+    def estimate(self, landmark_points, frame_shape):
+        """Return (pitch, yaw, roll) in degrees from six normalized landmarks"""
+        start = time.perf_counter()
+        h, w = frame_shape[:2]
+        camera_matrix, dist_coeffs = self.intrinsics(frame_shape)
+        np.multiply(landmark_points, (w, h), out=self.image_points)
+
+        use_guess = self.warm_start and self.has_guess
+        success, rotation_vector, translation_vector = cv2.solvePnP(
+            MODEL_POINTS, self.image_points, camera_matrix, dist_coeffs,
+            self.rotation_vector, self.translation_vector,
+            useExtrinsicGuess=use_guess, flags=self.flags
+        )
+
+        angles = (None, None, None)
+        if success:
+            self.rotation_vector[:] = rotation_vector
+            self.translation_vector[:] = translation_vector
+            self.has_guess = True
+            angles = self.euler_angles(rotation_vector)
+        else:
+            self.has_guess = False
+
+        self.last_time = time.perf_counter() - start
+        self.total_time += self.last_time
+        self.calls += 1
+        return angles
+
+    @staticmethod
+    def euler_angles(rotation_vector):
+        """Convert a rotation vector to (pitch, yaw, roll) in degrees"""
+        rotation_matrix, _ = cv2.Rodrigues(rotation_vector)
+        return HeadPoseEstimator.matrix_euler_angles(rotation_matrix)
+
+    @staticmethod
+    def matrix_euler_angles(matrix):
+        """Convert a 3x3 rotation (or 4x4 transformation) matrix to (pitch, yaw, roll) in degrees"""
+        (r00, _, _), (r10, r11, r12), (r20, r21, r22) = np.asarray(matrix)[:3, :3].tolist()
+
+        sy = math.hypot(r00, r10)
+        if sy >= 1e-6:
+            x = math.atan2(r21, r22)
+            y = math.atan2(-r20, sy)
+            z = math.atan2(r10, r00)
+        else:
+            x = math.atan2(-r12, r11)
+            y = math.atan2(-r20, sy)
+            z = 0.0
+
+        return math.degrees(x), math.degrees(y), math.degrees(z)
+
+    @property
+    def average_time(self):
+        """Mean time per estimate in seconds"""
+        return self.total_time / self.calls if self.calls else 0.0
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Landmark Cache and Batch Re-scoring
+Persists each analyzed frame's raw landmarks and head pose so the decision
+logic can be tuned without running Face Mesh again. BatchRescorer replays
+analyze_frame's checks, the time-windowed smoothing and the verdict
+hysteresis over the whole (frames x 478 x 3) array with NumPy, for a whole
+grid of threshold combinations in one pass; ThresholdCalibrator builds the
+'c' key's calibration on it
+"""
+
+import argparse
+import itertools
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, asdict, fields, replace
+
+import numpy as np
+
+from telemetry import ColumnStore, attention_violations
+
+LANDMARKS = 478  # Face Mesh with iris refinement
+
+class LandmarkCache(ColumnStore):
+    """Per-frame landmark tensors and head pose, one memory-mapped file per column"""
+    COLUMNS = {
+        "timestamp": (np.float64, ()),
+        "landmark_count": (np.uint16, ()),      # 0 without a face
+        "points": (np.float32, (LANDMARKS, 3)),
+        "pose": (np.float64, (3,))              # pitch, yaw, roll; NaN when not solved
+    }
+
+    def __init__(self, path, capacity=30 * 60 * 5, **kwargs):
+        super().__init__(path, capacity=capacity, **kwargs)
+
+    def append(self, timestamp, points, pitch=None, yaw=None, roll=None):
+        """Append one frame's landmark array (None without a face) and head pose"""
+        index = self.reserve()
+        columns = self.columns
+        columns["timestamp"][index] = timestamp
+        if points is None:
+            columns["landmark_count"][index] = 0
+        else:
+            count = min(len(points), LANDMARKS)
+            columns["landmark_count"][index] = count
+            columns["points"][index, :count] = points[:count]
+        pose = columns["pose"][index]
+        pose[0] = np.nan if pitch is None else pitch
+        pose[1] = np.nan if yaw is None else yaw
+        pose[2] = np.nan if roll is None else roll
+        self.commit(timestamp)
+
+@dataclass(frozen=True)
+class Thresholds:
+    """Every tunable of analyze_frame's decision logic"""
+    ear: float = 0.22               # EYE_ASPECT_RATIO_THRESHOLD
+    iris_low: float = 0.4           # IRIS_WINDOW
+    iris_high: float = 0.6
+    gaze_score: float = 0.8         # GAZE_SCORE_THRESHOLD
+    head_pose: float = 15.0         # HEAD_POSE_THRESHOLD, degrees
+    face_stability: float = 0.85    # StabilityTracker enter thresholds
+    eye_stability: float = 0.8
+    pose_stability: float = 0.75
+    gaze_stability: float = 0.7
+    exit_margin: float = 0.1
+    alert_threshold: float = 3.0
+
+    @classmethod
+    def from_detector(cls, detector):
+        """The thresholds a detector currently decides with"""
+        stability = detector.stability
+        enter = stability.enter_thresholds
+        low, high = detector.IRIS_WINDOW
+        return cls(detector.EYE_ASPECT_RATIO_THRESHOLD, low, high, detector.GAZE_SCORE_THRESHOLD,
+                   detector.HEAD_POSE_THRESHOLD, enter["face"], enter["eye"], enter["pose"], enter["gaze"],
+                   stability.exit_margin, stability.alert_threshold)
+
+    def to_dict(self):
+        """Plain dict representation for logging or serialization"""
+        return asdict(self)
+
+    def __str__(self):
+        return (f"EAR>{self.ear:g} iris {self.iris_low:g}-{self.iris_high:g} gaze>{self.gaze_score:g} "
+                f"pose<{self.head_pose:g}° stability {self.face_stability:g}/{self.eye_stability:g}/"
+                f"{self.pose_stability:g}/{self.gaze_stability:g}")
+
+FIELDS = tuple(field.name for field in fields(Thresholds))
+
+class BatchRescorer:
+    """Vectorized replay of analyze_frame's decisions over cached landmarks
+
+    Threshold-independent features (EAR, iris ratios, gaze score, pose
+    angle, window boundaries) are computed once in the same float32/float64
+    arithmetic as the live path; each threshold combination then costs a
+    few whole-array comparisons and cumulative sums.
+    """
+    def __init__(self, timestamps, landmark_counts, points, pose, detector, windows=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.frames = len(self.timestamps)
+
+        # Checks that need no thresholds
+        self.face = landmark_counts > 0
+        self.eyes = landmark_counts > detector.IRIS_INDEX_ARRAY.max()
+
+        # EAR per eye in float32 like calculate_eye_aspect_ratios, averaged in float64
+        eyes = points[:, detector.EAR_INDEX_ARRAY, :2]
+        vertical = np.linalg.norm(eyes[:, :, [1, 2]] - eyes[:, :, [5, 4]], axis=-1).sum(axis=2)
+        horizontal = np.linalg.norm(eyes[:, :, 0] - eyes[:, :, 3], axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ears = vertical / (2.0 * horizontal)
+        self.avg_ear = (ears[:, 0].astype(np.float64) + ears[:, 1]) / 2.0
+
+        # Iris ratios like calculate_iris_positions: (frames, eye, x/y)
+        iris_centers = points[:, detector.IRIS_INDEX_ARRAY, :2].mean(axis=2)
+        corners = points[:, detector.IRIS_CORNER_INDEX_ARRAY, :2]
+        left_x = corners[:, :, 0, 0]
+        bottom_y = corners[:, :, 3, 1]
+        eye_width = np.abs(corners[:, :, 1, 0] - left_x)
+        eye_height = np.abs(corners[:, :, 2, 1] - bottom_y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.stack([
+                np.where(eye_width > 0, (iris_centers[..., 0] - left_x) / eye_width, 0.5),
+                np.where(eye_height > 0, (iris_centers[..., 1] - bottom_y) / eye_height, 0.5)
+            ], axis=2).astype(np.float64)
+
+        # Both irises are centered when all four ratios lie inside the window
+        flat = ratios.reshape(self.frames, 4)
+        self.iris_min = flat.min(axis=1)
+        self.iris_max = flat.max(axis=1)
+        self.gaze_score = 1.0 - (np.abs((ratios[:, 0, 0] + ratios[:, 1, 0]) / 2 - 0.5) +
+                                 np.abs((ratios[:, 0, 1] + ratios[:, 1, 1]) / 2 - 0.5))
+
+        # The head is straight when both |pitch| and |yaw| are under the threshold (NaN never is)
+        self.pose_angle = np.maximum(np.abs(pose[:, 0]), np.abs(pose[:, 1]))
+
+        # Oldest frame inside each window at every frame (TimeWindow drops samples at or before the cutoff)
+        windows = windows or {name: window.seconds for name, window in detector.stability.windows.items()}
+        self.windows = dict(windows)
+        self.window_starts = {
+            name: np.searchsorted(self.timestamps, self.timestamps - seconds, side="right")
+            for name, seconds in windows.items()
+        }
+        self.face_ratio = self.window_ratio(self.face[np.newaxis], None, "face")[0]
+        self.eye_ratio = self.window_ratio(self.eyes[np.newaxis], None, "eye")[0]
+
+    @classmethod
+    def from_cache(cls, cache, detector, windows=None):
+        """Build from a LandmarkCache (windows default to the recorded ones)"""
+        return cls(cache.column("timestamp"), cache.column("landmark_count"), cache.column("points"),
+                   cache.column("pose"), detector, windows or cache.attributes.get("windows"))
+
+    @property
+    def longest_window(self):
+        """Longest smoothing window in seconds"""
+        return max(self.windows.values())
+
+    def window_ratio(self, values, present, name):
+        """TimeWindow.ratio() at every frame for (rows, frames) samples
+
+        present marks frames that add a sample (None: all of them); the
+        others only age the window, like the gaze window on closed eyes.
+        """
+        start = self.window_starts[name]
+        rows = len(values)
+        sums = np.zeros((rows, self.frames + 1), dtype=np.int64)
+        np.cumsum(values & present if present is not None else values, axis=1, out=sums[:, 1:])
+        positives = sums[:, 1:] - sums[:, start]
+        if present is None:
+            counts = np.arange(1, self.frames + 1) - start
+        else:
+            np.cumsum(present, axis=1, out=sums[:, 1:])
+            counts = sums[:, 1:] - sums[:, start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(counts > 0, positives / counts, 0.0)
+
+    def evaluate(self, params):
+        """Per-frame (looking, valid) verdicts, shape (rows, frames)
+
+        params maps every Thresholds field to a (rows,) array.
+        """
+        column = {name: np.asarray(values, dtype=np.float64)[:, np.newaxis] for name, values in params.items()}
+        if (column["exit_margin"] < 0).any():
+            raise ValueError("exit_margin must not be negative")
+
+        # analyze_frame: eyes open, iris window, head pose and the gaze smoothing sample
+        eyes_open = self.eyes & (self.avg_ear > column["ear"])
+        looking = eyes_open & (self.iris_min > column["iris_low"]) & (self.iris_max < column["iris_high"])
+        pose_valid = self.pose_angle < column["head_pose"]
+        gaze_sample = self.gaze_score > column["gaze_score"]
+
+        # StabilityTracker.update: windowed ratios against enter / exit cutoffs
+        pose_ratio = self.window_ratio(pose_valid, None, "pose")
+        gaze_ratio = self.window_ratio(gaze_sample, eyes_open, "gaze")
+        margin = column["exit_margin"]
+        enter = looking & (self.face_ratio > column["face_stability"]) & \
+            (self.eye_ratio > column["eye_stability"]) & (pose_ratio > column["pose_stability"]) & \
+            (gaze_ratio > column["gaze_stability"])
+        stay = (self.face_ratio > column["face_stability"] - margin) & \
+            (self.eye_ratio > column["eye_stability"] - margin) & \
+            (pose_ratio > column["pose_stability"] - margin) & (gaze_ratio > column["gaze_stability"] - margin)
+
+        # Hysteresis without a loop: entering implies staying (exit cutoffs
+        # are lower), so a frame is valid when the verdict was entered at or
+        # after the last frame that broke the exit cutoffs
+        index = np.arange(self.frames)
+        last_enter = np.maximum.accumulate(np.where(enter, index, -1), axis=1)
+        last_break = np.maximum.accumulate(np.where(stay, -1, index), axis=1)
+        valid = (last_enter >= 0) & (last_enter >= last_break)
+        return looking, valid
+
+    def score(self, thresholds=None):
+        """Per-frame verdicts of one threshold set as a dict of arrays"""
+        thresholds = thresholds or Thresholds()
+        looking, valid = self.evaluate({name: [getattr(thresholds, name)] for name in FIELDS})
+        return {"looking_at_camera": looking[0], "is_valid": valid[0]}
+
+    def sweep(self, grid, base=None, settle=0.0, max_cells=1 << 21):
+        """Score every combination of grid values in one pass
+
+        grid maps Thresholds fields to candidate values; the other fields
+        come from base. Ratios skip the first `settle` seconds, while the
+        windows fill. Returns (combinations, dict of per-combination arrays).
+        """
+        base = base or Thresholds()
+        names = list(grid)
+        combinations = [replace(base, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+        params = {name: np.array([getattr(combo, name) for combo in combinations], dtype=np.float64)
+                  for name in FIELDS}
+
+        total = len(combinations)
+        metrics = {
+            "valid_ratio": np.zeros(total),
+            "looking_ratio": np.zeros(total),
+            "violations": np.zeros(total, dtype=np.int64),
+            "violation_s": np.zeros(total),
+            "longest_violation_s": np.zeros(total)
+        }
+        if not self.frames:
+            return combinations, metrics
+
+        settled = self.timestamps >= self.timestamps[0] + settle
+        if not settled.any():
+            settled[:] = True
+
+        # Rows are evaluated in chunks so temporaries stay a few tens of MB
+        chunk = max(1, max_cells // self.frames)
+        for first in range(0, total, chunk):
+            rows = slice(first, min(first + chunk, total))
+            looking, valid = self.evaluate({name: values[rows] for name, values in params.items()})
+            metrics["valid_ratio"][rows] = valid[:, settled].mean(axis=1)
+            metrics["looking_ratio"][rows] = looking[:, settled].mean(axis=1)
+
+            # Violations per combination; the alert threshold may differ per row
+            row_count = len(looking)
+            violation_rows, _, durations = attention_violations(self.timestamps, ~looking, 0.0)
+            keep = durations > params["alert_threshold"][rows][violation_rows]
+            violation_rows, durations = violation_rows[keep], durations[keep]
+            metrics["violations"][rows] = np.bincount(violation_rows, minlength=row_count)
+            metrics["violation_s"][rows] = np.bincount(violation_rows, weights=durations, minlength=row_count)
+            longest = np.zeros(row_count)
+            np.maximum.at(longest, violation_rows, durations)
+            metrics["longest_violation_s"][rows] = longest
+        return combinations, metrics
+
+@dataclass
+class CalibrationResult:
+    """Outcome of one calibration"""
+    thresholds: Thresholds      # None when no combination passed
+    frames: int
+    combinations: int
+    passing: int
+    valid_ratio: float          # settled valid share of the calibration segment with thresholds
+    elapsed: float              # seconds spent re-scoring
+    reason: str = ""
+
+class ThresholdCalibrator:
+    """Picks the strictest grid thresholds under which an attentive segment stays valid
+
+    The candidate looks at the camera for `seconds` while the raw landmarks
+    are cached. The grid is then re-scored in one pass; of the combinations
+    that keep at least target_ratio of the settled frames valid, the
+    strictest wins, relaxed by margin_steps grid steps per field so normal
+    movement later on doesn't trip it.
+    """
+    GRID = {
+        "ear": (0.16, 0.18, 0.2, 0.22, 0.24, 0.26),
+        "iris_low": (0.3, 0.35, 0.4, 0.45),
+        "iris_high": (0.55, 0.6, 0.65, 0.7),
+        "gaze_score": (0.7, 0.75, 0.8, 0.85, 0.9),
+        "head_pose": (10.0, 15.0, 20.0, 25.0, 30.0)
+    }
+
+    # Direction in which each field gets stricter
+    STRICTER = {"ear": 1, "iris_low": 1, "iris_high": -1, "gaze_score": 1, "head_pose": -1}
+
+    def __init__(self, detector, seconds=5.0, target_ratio=0.95, grid=None, margin_steps=1):
+        self.detector = detector
+        self.seconds = seconds
+        self.target_ratio = target_ratio
+        self.grid = {name: tuple(sorted(values)) for name, values in (grid or self.GRID).items()}
+        self.margin_steps = margin_steps
+
+        self.path = None
+        self.cache = None
+        self.started = None
+
+    def start(self):
+        """Begin collecting frames into a temporary landmark cache"""
+        self.path = tempfile.mkdtemp(prefix="calibration-")
+        self.cache = LandmarkCache(self.path, capacity=int(self.seconds * 60) + 1)
+        return self
+
+    def add(self, timestamp, points, pitch, yaw, roll):
+        """Cache one analyzed frame; the segment starts with the first one"""
+        if self.started is None:
+            self.started = timestamp
+        self.cache.append(timestamp, points, pitch, yaw, roll)
+
+    def complete(self, now):
+        """Whether the calibration segment is long enough"""
+        return self.started is not None and now - self.started >= self.seconds
+
+    def finish(self):
+        """Sweep the grid over the segment and pick thresholds"""
+        start = time.perf_counter()
+        try:
+            return self.choose(start)
+        finally:
+            self.cancel()
+
+    def choose(self, start):
+        """Pick the relaxed strictest passing combination"""
+        cache = self.cache
+        frames = cache.count
+        face_frames = int(np.count_nonzero(cache.column("landmark_count")))
+        if face_frames < frames / 2 or not frames:
+            return CalibrationResult(None, frames, 0, 0, 0.0, time.perf_counter() - start,
+                                     f"face found in only {face_frames} of {frames} frames")
+
+        rescorer = BatchRescorer.from_cache(cache, self.detector)
+        base = Thresholds.from_detector(self.detector)
+        combinations, metrics = rescorer.sweep(self.grid, base, settle=rescorer.longest_window)
+        passing = np.flatnonzero(metrics["valid_ratio"] >= self.target_ratio)
+        if not len(passing):
+            best = float(metrics["valid_ratio"].max())
+            return CalibrationResult(None, frames, len(combinations), 0, best, time.perf_counter() - start,
+                                     f"at best {best * 100:.0f}% of the segment was valid")
+
+        # Strictness: mean normalized grid position, 1 = strictest value of every field
+        positions = {name: np.array([values.index(getattr(combo, name)) for combo in combinations])
+                     for name, values in self.grid.items()}
+        strictness = np.zeros(len(combinations))
+        for name, values in self.grid.items():
+            position = positions[name] / max(len(values) - 1, 1)
+            strictness += position if self.STRICTER.get(name, 1) > 0 else 1 - position
+        order = np.lexsort((-metrics["valid_ratio"][passing], -strictness[passing]))
+        chosen = combinations[passing[order[0]]]
+
+        # Relax every field a few grid steps toward the lenient end
+        relaxed = {}
+        for name, values in self.grid.items():
+            index = values.index(getattr(chosen, name)) - self.STRICTER.get(name, 1) * self.margin_steps
+            relaxed[name] = values[min(max(index, 0), len(values) - 1)]
+        chosen = replace(chosen, **relaxed)
+        _, final = rescorer.sweep({}, chosen, settle=rescorer.longest_window)
+
+        return CalibrationResult(chosen, frames, len(combinations), len(passing),
+                                 float(final["valid_ratio"][0]), time.perf_counter() - start)
+
+    def cancel(self):
+        """Drop the collected frames"""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if self.path:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+def parse_assignment(text, multiple):
+    """FIELD=VALUE (or FIELD=V1,V2,... with multiple) from the command line"""
+    name, _, values = text.partition("=")
+    if name not in FIELDS or not values:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE with FIELD one of {', '.join(FIELDS)}")
+    numbers = [float(value) for value in values.split(",")]
+    return name, (numbers if multiple else numbers[0])
+
+def main():
+    """Re-score a landmark cache with other thresholds"""
+    from app import AdvancedFaceDetector
+
+    parser = argparse.ArgumentParser(description="Re-score cached landmarks over threshold combinations")
+    parser.add_argument("path", help="landmark cache directory written with --landmark-cache")
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                        type=lambda text: parse_assignment(text, False), help="override one threshold")
+    parser.add_argument("--sweep", action="append", default=[], metavar="FIELD=V1,V2,...",
+                        type=lambda text: parse_assignment(text, True), help="candidate values of one threshold")
+    parser.add_argument("--sort", default="valid_ratio",
+                        choices=["valid_ratio", "looking_ratio", "violations", "violation_s", "longest_violation_s"],
+                        help="sweep table order (descending)")
+    parser.add_argument("--top", type=int, default=20, help="sweep rows to print")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="treat the cache as an attentive segment and pick thresholds like the 'c' key")
+    args = parser.parse_args()
+
+    detector = AdvancedFaceDetector(headless=True, load_models=False)
+    cache = LandmarkCache.load(args.path)
+    recorded = cache.attributes.get("thresholds")
+    base = replace(Thresholds(**recorded) if recorded else Thresholds(), **dict(args.set))
+
+    start = time.perf_counter()
+    rescorer = BatchRescorer.from_cache(cache, detector)
+    setup_time = time.perf_counter() - start
+
+    print("=" * 70)
+    print(f"🗂️  LANDMARK CACHE: {args.path} ({cache.count:,} frames, {cache.nbytes / 1e6:.1f} MB)")
+    print("=" * 70)
+    print(f"⚙️  Features computed in {setup_time * 1000:.1f} ms")
+
+    if args.calibrate:
+        calibrator = ThresholdCalibrator(detector)
+        detector.apply_thresholds(base)
+        calibrator.cache = cache
+        outcome = calibrator.choose(time.perf_counter())
+        if outcome.thresholds is None:
+            print(f"⚠ Calibration failed: {outcome.reason}")
+        else:
+            print(f"🎯 Calibrated: {outcome.thresholds} ({outcome.valid_ratio * 100:.1f}% valid; "
+                  f"{outcome.passing:,} of {outcome.combinations:,} combinations passed, "
+                  f"{outcome.elapsed * 1000:.0f} ms)")
+        base = outcome.thresholds or base
+
+    grid = dict(args.sweep)
+    start = time.perf_counter()
+    combinations, metrics = rescorer.sweep(grid, base)
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {len(combinations):,} combinations x {cache.count:,} frames re-scored in {elapsed * 1000:.1f} ms")
+
+    names = list(grid) or ["ear", "head_pose"]
+    header = " ".join(f"{name:>14}" for name in names)
+    print("-" * 70)
+    print(f"{header}  {'valid':>7} {'looking':>8} {'viol.':>6} {'viol. s':>8} {'longest':>8}")
+    order = np.argsort(-metrics[args.sort], kind="stable")[:args.top]
+    for index in order:
+        combo = combinations[index]
+        values = " ".join(f"{getattr(combo, name):>14g}" for name in names)
+        print(f"{values}  {metrics['valid_ratio'][index] * 100:>6.1f}% {metrics['looking_ratio'][index] * 100:>7.1f}% "
+              f"{metrics['violations'][index]:>6} {metrics['violation_s'][index]:>8.1f} "
+              f"{metrics['longest_violation_s'][index]:>8.1f}")
+    print("=" * 70)
+    cache.close()
+
+if __name__ == "__main__":
+    main()
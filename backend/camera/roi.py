@@ -0,0 +1,100 @@
+"""
+Face ROI Cropping
+Feeds Face Mesh only a padded, downscaled crop around the previous frame's
+face and maps the landmarks back to full-frame coordinates
+"""
+
+import cv2
+import numpy as np
+
+class FaceRoiCropper:
+    """Keeps a slowly moving crop box around the face"""
+    def __init__(self, margin=0.35, max_size=256, recenter_tolerance=0.1, min_size=64):
+        # Padding around the landmark bounding box, as a fraction of its size
+        self.margin = margin
+
+        # Longest side of the image actually given to Face Mesh
+        self.max_size = max_size
+        self.min_size = min_size
+
+        # The box only moves when the face nears its edge, which keeps the
+        # crop stable for Face Mesh's own frame-to-frame tracking
+        self.recenter_tolerance = recenter_tolerance
+
+        self.box = None
+
+        # Metrics
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def reset(self):
+        """Forget the box so the next frame uses the full image"""
+        self.box = None
+
+    def reset_statistics(self):
+        """Zero the crop counters"""
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def crop(self, frame):
+        """Return (image, box) for inference, or None to use the full frame"""
+        if self.box is None:
+            self.full_frames += 1
+            return None
+
+        x0, y0, x1, y1 = self.box
+        image = frame[y0:y1, x0:x1]
+
+        # Downscale large crops; Face Mesh resamples to its own input size anyway
+        scale = self.max_size / max(x1 - x0, y1 - y0)
+        if scale < 1.0:
+            size = (max(int((x1 - x0) * scale), 1), max(int((y1 - y0) * scale), 1))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+        self.roi_frames += 1
+        return image, self.box
+
+    def to_frame(self, points, box, frame_shape):
+        """Map crop-normalized landmarks back to full-frame normalized coordinates"""
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = box
+        crop_w, crop_h = x1 - x0, y1 - y0
+
+        mapped = np.empty_like(points)
+        mapped[:, 0] = (points[:, 0] * crop_w + x0) / w
+        mapped[:, 1] = (points[:, 1] * crop_h + y0) / h
+        # Face Mesh depth shares the x scale
+        mapped[:, 2] = points[:, 2] * crop_w / w
+        return mapped
+
+    def update(self, points, frame_shape):
+        """Move the box to follow the latest full-frame landmarks"""
+        if points is None:
+            self.box = None
+            return
+
+        h, w = frame_shape[:2]
+        fx0, fy0 = points[:, :2].min(axis=0) * (w, h)
+        fx1, fy1 = points[:, :2].max(axis=0) * (w, h)
+        face_size = max(fx1 - fx0, fy1 - fy0, 1.0)
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            slack = self.recenter_tolerance * face_size
+            inside = (fx0 - slack >= x0 and fy0 - slack >= y0 and
+                      fx1 + slack <= x1 and fy1 + slack <= y1)
+            box_size = max(x1 - x0, y1 - y0)
+            expected = face_size * (1 + 2 * self.margin)
+            if inside and 0.8 < box_size / expected < 1.25:
+                return
+
+        # Square box centered on the face, clamped to the frame
+        half = max(face_size * (0.5 + self.margin), self.min_size / 2)
+        cx, cy = (fx0 + fx1) / 2, (fy0 + fy1) / 2
+        x0, y0 = max(int(cx - half), 0), max(int(cy - half), 0)
+        x1, y1 = min(int(cx + half), w), min(int(cy + half), h)
+
+        if x1 - x0 < self.min_size or y1 - y0 < self.min_size:
+            self.box = None
+            return
+        self.box = (x0, y0, x1, y1)
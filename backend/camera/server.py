@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Multi-Session Proctoring Server
+Accepts encoded webcam frames for many candidates over a local socket and
+streams back per-frame verdicts, spreading analysis over a pool of worker
+processes that each own a single MediaPipe Face Mesh
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import zlib
+import warnings
+warnings.filterwarnings("ignore")
+
+# Frame message: header, session id (utf-8), encoded JPEG/WebP image.
+# An empty image closes the session.
+FRAME_HEADER = struct.Struct(">IHd")  # image length, session id length, client timestamp
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+
+def session_worker(worker_id, frame_queue, result_queue):
+    """Worker process owning one Face Mesh and the detectors of its sessions"""
+    # Heavy imports happen in the worker, not in the socket process
+    import cv2
+    import numpy as np
+    from app import AdvancedFaceDetector, create_face_mesh
+
+    # Frames from different sessions are interleaved, so the mesh must not
+    # carry tracking state from one candidate's frame into another's
+    face_mesh = create_face_mesh(static_image_mode=True)
+    sessions = {}
+
+    while True:
+        try:
+            task = frame_queue.get()
+        except KeyboardInterrupt:
+            # The socket process coordinates shutdown
+            continue
+        if task is None:
+            break
+
+        session_id, seq, client_time, payload = task
+
+        # Session closed: drop its smoothing buffers
+        if not payload:
+            sessions.pop(session_id, None)
+            continue
+
+        detector = sessions.get(session_id)
+        if detector is None:
+            detector = AdvancedFaceDetector(headless=True, face_mesh=face_mesh)
+            sessions[session_id] = detector
+
+        start = time.perf_counter()
+        frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            result_queue.put((session_id, seq, client_time, None, 0.0, worker_id))
+            continue
+
+        # Client capture timestamps keep the stability windows true to the stream
+        result, is_valid = detector.analyze_frame(frame, client_time if client_time > 0 else None)
+        detector.total_frames += 1
+        if is_valid:
+            detector.valid_frames += 1
+
+        elapsed = time.perf_counter() - start
+        result_queue.put((session_id, seq, client_time, result.to_dict(), elapsed, worker_id))
+
+class Session:
+    """Per-candidate dispatch state kept in the socket process"""
+    def __init__(self, session_id, worker_id, writer):
+        self.session_id = session_id
+        self.worker_id = worker_id
+        self.writer = writer
+
+        # At most one frame in flight plus the newest waiting frame
+        self.in_flight = False
+        self.pending = None
+
+        # Number of the last frame dispatched (server-wide, see ProctoringServer.next_seq)
+        self.seq = 0
+
+        # Statistics
+        self.received_frames = 0
+        self.processed_frames = 0
+        self.dropped_frames = 0
+
+class ProctoringServer:
+    """Socket front end that fans frames out to sticky worker processes"""
+    def __init__(self, num_workers=None, stats_interval=10.0, watch_interval=1.0):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.stats_interval = stats_interval
+
+        # How often worker processes are checked for crashes (seconds)
+        self.watch_interval = watch_interval
+
+        self.ctx = None
+        self.workers = []
+        self.frame_queues = []
+        self.result_queue = None
+        self.sessions = {}
+
+        # Dispatch numbers are server-wide, so a reopened session id never
+        # accepts a late result meant for its predecessor
+        self.next_seq = 0
+
+        self.loop = None
+        self.server = None
+        self.result_thread = None
+
+        # Statistics
+        self.start_time = time.time()
+        self.total_processed = 0
+        self.total_dropped = 0
+        self.decode_errors = 0
+        self.worker_restarts = 0
+        self.lost_frames = 0
+
+    def start_workers(self):
+        """Spawn one analysis process per worker slot"""
+        self.ctx = multiprocessing.get_context("spawn")
+        self.result_queue = self.ctx.Queue()
+
+        self.frame_queues = [None] * self.num_workers
+        self.workers = [None] * self.num_workers
+        for worker_id in range(self.num_workers):
+            self.spawn_worker(worker_id)
+
+        print(f"✓ Started {self.num_workers} Face Mesh worker processes")
+
+    def spawn_worker(self, worker_id):
+        """Start (or replace) the process and frame queue of one worker slot"""
+        frame_queue = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=session_worker,
+            args=(worker_id, frame_queue, self.result_queue),
+            name=f"face-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.frame_queues[worker_id] = frame_queue
+        self.workers[worker_id] = process
+
+    def on_worker_failed(self, worker_id, exitcode):
+        """Replace a crashed worker and requeue the sessions it was serving
+
+        The frame each session had in flight is lost and the client is told,
+        since the replacement starts the session's smoothing from scratch.
+        A waiting frame goes to the new process right away.
+        """
+        self.worker_restarts += 1
+        print(f"\n⚠ Worker {worker_id} exited unexpectedly (code {exitcode}), restarting it")
+
+        # Frames still queued for the dead process go down with its queue
+        self.frame_queues[worker_id].cancel_join_thread()
+        self.spawn_worker(worker_id)
+
+        for session in self.sessions.values():
+            if session.worker_id != worker_id or not session.in_flight:
+                continue
+            session.in_flight = False
+            self.lost_frames += 1
+            if not session.writer.is_closing():
+                message = {"session": session.session_id, "seq": session.seq, "worker": worker_id,
+                           "error": "worker_restarted"}
+                session.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+            if session.pending is not None:
+                client_time, payload = session.pending
+                session.pending = None
+                self._dispatch(session, client_time, payload)
+
+    async def watch_workers(self):
+        """Check the worker processes periodically and handle crashes"""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            for worker_id, process in enumerate(self.workers):
+                if not process.is_alive():
+                    self.on_worker_failed(worker_id, process.exitcode)
+
+    def worker_for(self, session_id):
+        """Sticky worker assignment so a session's buffers stay in one process"""
+        return zlib.crc32(session_id.encode("utf-8")) % self.num_workers
+
+    def submit_frame(self, session_id, client_time, payload, writer):
+        """Queue a frame, replacing any older frame the session has waiting"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, self.worker_for(session_id), writer)
+            self.sessions[session_id] = session
+        session.writer = writer
+        session.received_frames += 1
+
+        # Backpressure: a slow session drops its own stale frames
+        if session.in_flight:
+            if session.pending is not None:
+                session.dropped_frames += 1
+                self.total_dropped += 1
+            session.pending = (client_time, payload)
+            return
+
+        self._dispatch(session, client_time, payload)
+
+    def _dispatch(self, session, client_time, payload):
+        """Hand a frame to the session's worker"""
+        self.next_seq += 1
+        session.seq = self.next_seq
+        session.in_flight = True
+        self.frame_queues[session.worker_id].put((session.session_id, session.seq, client_time, payload))
+
+    def close_session(self, session_id):
+        """Forget a session and release its worker-side state"""
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.frame_queues[session.worker_id].put((session_id, 0, 0.0, b""))
+
+    def _result_pump(self):
+        """Move worker results onto the event loop (runs on a thread)"""
+        while True:
+            item = self.result_queue.get()
+            if item is None:
+                break
+            self.loop.call_soon_threadsafe(self._deliver, item)
+
+    def _deliver(self, item):
+        """Send a verdict to the session's client and release its next frame"""
+        session_id, seq, client_time, result, elapsed, worker_id = item
+        session = self.sessions.get(session_id)
+
+        # A result older than the session's last dispatch was already given up on
+        if session is None or seq != session.seq:
+            return
+
+        session.in_flight = False
+        if result is None:
+            self.decode_errors += 1
+        else:
+            session.processed_frames += 1
+            self.total_processed += 1
+            message = {
+                "session": session_id,
+                "seq": seq,
+                "timestamp": client_time,
+                "worker": worker_id,
+                "analysis_ms": round(elapsed * 1000, 2),
+                "dropped": session.dropped_frames,
+                "result": result
+            }
+            if not session.writer.is_closing():
+                session.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+        # Only the newest waiting frame is ever analyzed
+        if session.pending is not None:
+            client_time, payload = session.pending
+            session.pending = None
+            self._dispatch(session, client_time, payload)
+
+    async def handle_client(self, reader, writer):
+        """Read frame messages from one connection (may carry many sessions)"""
+        owned_sessions = set()
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                image_length, id_length, client_time = FRAME_HEADER.unpack(header)
+                if image_length > MAX_FRAME_BYTES:
+                    print(f"\n⚠ Frame of {image_length} bytes rejected, closing connection")
+                    break
+
+                session_id = (await reader.readexactly(id_length)).decode("utf-8")
+                payload = await reader.readexactly(image_length)
+
+                if not payload:
+                    self.close_session(session_id)
+                    owned_sessions.discard(session_id)
+                    continue
+
+                owned_sessions.add(session_id)
+                self.submit_frame(session_id, client_time, payload, writer)
+
+                # Let slow clients apply TCP backpressure on their own stream
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            for session_id in owned_sessions:
+                self.close_session(session_id)
+            writer.close()
+
+    async def print_stats(self):
+        """Periodically print throughput to the terminal"""
+        last_processed = 0
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            fps = (self.total_processed - last_processed) / self.stats_interval
+            last_processed = self.total_processed
+            print(f"\r[SERVER] Sessions:{len(self.sessions)} FPS:{fps:.1f} "
+                  f"Processed:{self.total_processed} Dropped:{self.total_dropped} "
+                  f"DecodeErrors:{self.decode_errors} Restarts:{self.worker_restarts}", end="", flush=True)
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        """Start workers and accept connections until cancelled"""
+        self.loop = asyncio.get_running_loop()
+        self.start_workers()
+
+        self.result_thread = threading.Thread(target=self._result_pump, name="result-pump", daemon=True)
+        self.result_thread.start()
+
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+            print(f"✓ Listening on unix socket {unix_path}")
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+            print(f"✓ Listening on {host}:{port}")
+
+        stats_task = asyncio.create_task(self.print_stats())
+        watch_task = asyncio.create_task(self.watch_workers())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            stats_task.cancel()
+            watch_task.cancel()
+
+    def shutdown(self):
+        """Stop workers and print a summary"""
+        if self.result_thread is not None:
+            self.result_queue.put(None)
+            self.result_thread.join(timeout=2.0)
+        for frame_queue in self.frame_queues:
+            frame_queue.put(None)
+        for process in self.workers:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+
+        elapsed = time.time() - self.start_time
+        print("\n\n" + "=" * 70)
+        print("🏁 PROCTORING SERVER SUMMARY")
+        print("=" * 70)
+        print(f"📊 Frames Processed: {self.total_processed:,}")
+        print(f"🗑️  Frames Dropped (backpressure): {self.total_dropped:,}")
+        if self.worker_restarts:
+            print(f"💥 Worker Restarts: {self.worker_restarts:,} ({self.lost_frames:,} frames lost in flight)")
+        print(f"📈 Average Throughput: {self.total_processed / max(elapsed, 1):.1f} FPS")
+        print("=" * 70)
+
+def main():
+    """Run the proctoring server"""
+    parser = argparse.ArgumentParser(description="Multi-session proctoring server")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host to bind")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to bind")
+    parser.add_argument("--unix", dest="unix_path", help="listen on a unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of Face Mesh worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    print("🚀 Starting Multi-Session Proctoring Server...")
+    server = ProctoringServer(num_workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        print("\n\n🛑 Shutting down gracefully...")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
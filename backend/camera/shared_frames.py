@@ -0,0 +1,259 @@
+"""
+Shared-Memory Frame Transport
+Keeps capture and display in one process and runs Face Mesh analysis in
+others. Frames are written once into a ring of fixed-size shared-memory
+slots; only slot indices and compact result records cross the process
+boundary
+"""
+
+import multiprocessing
+import queue
+import time
+from dataclasses import astuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+class SharedFrameRing:
+    """Fixed-size uint8 frame slots backed by one shared-memory block"""
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.slot_bytes = int(np.prod(self.shape))
+
+        # Creator owns (and finally unlinks) the block, everyone else attaches
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        else:
+            self.shm = self.attach(name)
+        self.name = self.shm.name
+
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @staticmethod
+    def attach(name):
+        """Open an existing block without taking responsibility for unlinking it"""
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers the block; spawned workers share
+            # the creator's resource tracker, so that registration is a no-op
+            return shared_memory.SharedMemory(name=name)
+
+    def frame(self, slot):
+        """Zero-copy view of one slot"""
+        return self.frames[slot]
+
+    def close(self):
+        """Detach (and unlink when owned)"""
+        # The array view must go before the mapping can be closed
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def analysis_worker(worker_id, ring_name, shape, slots, options, work_queue, result_queue, ready, current):
+    """Analysis process: measures frames directly on shared slots
+
+    Workers see only a share of the frames, so they return the raw checks
+    (and the gaze sample); the capture process smooths them into verdicts.
+    current[worker_id] holds the frame id being analyzed (-1 when idle), so
+    the capture process can reclaim the slot if this process dies.
+    """
+    # Heavy imports happen here, not in the capture process
+    from app import build_detector
+
+    ring = SharedFrameRing(shape, slots, name=ring_name)
+    detector = build_detector(**options)
+    detector.warm_up(shape)
+    ready.release()
+
+    try:
+        while True:
+            try:
+                task = work_queue.get()
+            except KeyboardInterrupt:
+                # The capture process coordinates shutdown
+                continue
+            if task is None:
+                break
+
+            slot, frame_id, capture_time = task
+            current[worker_id] = frame_id
+            start = time.perf_counter()
+
+            # Mesh drawing (when not headless) lands in the slot itself
+            detector.analyze_frame(ring.frame(slot), capture_time, decide=False)
+            elapsed = time.perf_counter() - start
+            result_queue.put((slot, frame_id, capture_time, worker_id, elapsed, astuple(detector.last_result),
+                              detector.gaze_sample))
+            current[worker_id] = -1
+    finally:
+        ring.close()
+
+class SharedFrameTransport:
+    """Capture-side end of the ring: slot bookkeeping and analysis processes
+
+    A slot is owned by the capture process while free, by an analysis
+    process while queued or analyzed, and by the capture process again
+    until release() once its result came back (so the annotated frame
+    can be displayed straight from shared memory). A crashed analysis
+    process is replaced and the slot it was analyzing is reclaimed.
+    """
+    def __init__(self, num_workers=2, slots=None, options=None, ready_timeout=60.0, watch_interval=1.0):
+        self.frame_shape = None
+        self.ready_timeout = ready_timeout
+        self.num_workers = num_workers
+
+        # How often analysis processes are checked for crashes (seconds)
+        self.watch_interval = watch_interval
+        self.next_watch = 0.0
+
+        # One slot per worker plus one waiting keeps queued frames fresh
+        self.slots = slots or num_workers + 1
+        self.options = options or {}
+
+        self.ring = None
+        self.ctx = None
+        self.work_queue = None
+        self.result_queue = None
+        self.ready = None
+        self.current = None
+        self.workers = []
+        self.free_slots = []
+        self.next_frame_id = 0
+
+        # Slot of every submitted frame whose result was not collected yet
+        self.outstanding = {}
+
+        # Ids of frames lost with a crashed process, for the consumer to skip
+        self.lost_frame_ids = set()
+
+        # Statistics
+        self.submitted_frames = 0
+        self.completed_frames = 0
+        self.dropped_frames = 0
+        self.worker_restarts = 0
+
+    def start(self, frame_shape):
+        """Create the ring for this frame size and spawn the analysis processes"""
+        self.frame_shape = tuple(frame_shape)
+        self.ring = SharedFrameRing(self.frame_shape, self.slots)
+        self.free_slots = list(range(self.slots))
+
+        self.ctx = multiprocessing.get_context("spawn")
+        self.work_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue()
+        self.ready = self.ctx.Semaphore(0)
+        self.current = self.ctx.Array("q", [-1] * self.num_workers, lock=False)
+        self.workers = [None] * self.num_workers
+        for worker_id in range(self.num_workers):
+            self.spawn_worker(worker_id)
+
+        # Model loading takes seconds; don't let capture fill the slots meanwhile
+        for _ in self.workers:
+            if not self.ready.acquire(timeout=self.ready_timeout):
+                raise RuntimeError("Analysis process did not start in time")
+        self.next_watch = time.perf_counter() + self.watch_interval
+        return self
+
+    def spawn_worker(self, worker_id):
+        """Start (or replace) the analysis process of one worker slot"""
+        self.current[worker_id] = -1
+        process = self.ctx.Process(
+            target=analysis_worker,
+            args=(worker_id, self.ring.name, self.frame_shape, self.slots, self.options,
+                  self.work_queue, self.result_queue, self.ready, self.current),
+            name=f"analysis-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = process
+
+    def check_workers(self, now):
+        """Replace crashed analysis processes (at most every watch_interval)
+
+        The frame a dead process was analyzing is lost: its slot goes back to
+        the free list and its id to lost_frame_ids. Frames still queued are
+        picked up by the other processes or the replacement.
+        """
+        if now < self.next_watch:
+            return
+        self.next_watch = now + self.watch_interval
+        for worker_id, process in enumerate(self.workers):
+            if process.is_alive():
+                continue
+            frame_id = self.current[worker_id]
+            print(f"\n⚠ Analysis process {worker_id} exited unexpectedly (code {process.exitcode}), restarting it")
+            self.worker_restarts += 1
+            slot = self.outstanding.pop(frame_id, None)
+            if slot is not None:
+                self.free_slots.append(slot)
+                self.lost_frame_ids.add(frame_id)
+            self.spawn_worker(worker_id)
+
+    @property
+    def started(self):
+        """Whether the ring and processes exist yet"""
+        return self.ring is not None
+
+    def acquire(self):
+        """Free slot to write the next frame into, or None when all are busy"""
+        if not self.free_slots:
+            self.dropped_frames += 1
+            return None
+        return self.free_slots.pop()
+
+    def frame(self, slot):
+        """Zero-copy view of one slot"""
+        return self.ring.frame(slot)
+
+    def submit(self, slot, capture_time):
+        """Hand a filled slot to the next idle analysis process"""
+        frame_id = self.next_frame_id
+        self.next_frame_id += 1
+        self.submitted_frames += 1
+        self.outstanding[frame_id] = slot
+        self.work_queue.put((slot, frame_id, capture_time))
+        return frame_id
+
+    def collect(self, timeout=0.0):
+        """Completed (slot, frame_id, capture_time, worker_id, seconds, fields, gaze_sample) records
+
+        Waits up to timeout for the first record, then drains without blocking.
+        Records of frames already written off by check_workers() are dropped,
+        their slots have been reused.
+        """
+        records = []
+        try:
+            records.append(self.result_queue.get(timeout=timeout) if timeout else self.result_queue.get_nowait())
+            while True:
+                records.append(self.result_queue.get_nowait())
+        except queue.Empty:
+            pass
+        records = [record for record in records if self.outstanding.pop(record[1], None) is not None]
+        self.completed_frames += len(records)
+        return records
+
+    def release(self, slot):
+        """Return a slot once its result has been consumed"""
+        self.free_slots.append(slot)
+
+    @property
+    def in_flight(self):
+        """Slots not free: queued, being analyzed or awaiting release"""
+        return self.slots - len(self.free_slots)
+
+    def stop(self):
+        """Stop the analysis processes and free the ring"""
+        for _ in self.workers:
+            self.work_queue.put(None)
+        for process in self.workers:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.workers = []
+        if self.ring:
+            self.ring.close()
+            self.ring = None
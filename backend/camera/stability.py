@@ -0,0 +1,205 @@
+"""
+Detection Stability Tracking
+Time-windowed running ratios of the per-frame checks, hysteresis on the
+final verdict and discrete attention-violation start/stop events
+"""
+
+from collections import deque
+from dataclasses import dataclass, asdict
+
+class TimeWindow:
+    """Running count of boolean samples from the last `seconds`"""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.samples = deque()
+        self.positives = 0
+
+        # Set once a sample aged out, i.e. the window spans its full duration
+        self.saturated = False
+
+    def add(self, timestamp, value):
+        """Append a sample and drop the ones that fell out of the window"""
+        self.samples.append((timestamp, value))
+        self.positives += value
+        self.expire(timestamp)
+
+    def expire(self, now):
+        """Drop samples older than the window (amortized O(1) per sample)"""
+        cutoff = now - self.seconds
+        samples = self.samples
+        while samples and samples[0][0] <= cutoff:
+            self.positives -= samples.popleft()[1]
+            self.saturated = True
+
+    def ratio(self):
+        """Share of positive samples in the window (0 when empty)"""
+        return self.positives / len(self.samples) if self.samples else 0.0
+
+    def clear(self):
+        """Forget all samples"""
+        self.samples.clear()
+        self.positives = 0
+        self.saturated = False
+
+    def __len__(self):
+        return len(self.samples)
+
+@dataclass
+class ViolationEvent:
+    """Start or end of a sustained period without attention"""
+    kind: str               # "start" or "stop"
+    timestamp: float        # when the event was raised
+    started_at: float       # last moment the candidate was looking at the camera
+    duration: float         # seconds without attention up to timestamp
+
+    def to_dict(self):
+        """Plain dict representation for logging or serialization"""
+        return asdict(self)
+
+class StabilityTracker:
+    """Smoothed validity with hysteresis and violation events
+
+    Windows are defined in seconds, so they mean the same thing at any
+    frame rate. The defaults match the old frame-count buffers at 30 FPS.
+    """
+    # Stability each check must exceed to become valid
+    ENTER_THRESHOLDS = {"face": 0.85, "eye": 0.8, "pose": 0.75, "gaze": 0.7}
+
+    def __init__(self, face_window=10 / 30, eye_window=15 / 30, pose_window=12 / 30, gaze_window=20 / 30,
+                 enter_thresholds=None, exit_margin=0.1, alert_threshold=3.0):
+        self.windows = {
+            "face": TimeWindow(face_window),
+            "eye": TimeWindow(eye_window),
+            "pose": TimeWindow(pose_window),
+            "gaze": TimeWindow(gaze_window)
+        }
+
+        self.set_thresholds(enter_thresholds or self.ENTER_THRESHOLDS, exit_margin)
+        self.valid = False
+
+        # Whether the last verdict came out the same whatever the one before it was
+        self.decisive = False
+
+        # Seconds without attention before a violation starts
+        self.alert_threshold = alert_threshold
+        self.last_attentive_time = None
+        self.last_timestamp = None
+        self.violation_start = None
+
+        self.subscribers = []
+
+        # Statistics
+        self.violation_count = 0
+        self.violation_seconds = 0.0
+
+    def set_thresholds(self, enter_thresholds, exit_margin):
+        """Replace the stability cutoffs of the verdict"""
+        # Once valid, each stability may sag by exit_margin before the
+        # verdict flips back, so borderline frames don't flicker
+        self.enter_thresholds = dict(enter_thresholds)
+        self.exit_margin = exit_margin
+        self.exit_thresholds = {name: value - exit_margin for name, value in self.enter_thresholds.items()}
+
+    @property
+    def longest_window(self):
+        """Longest window duration in seconds"""
+        return max(window.seconds for window in self.windows.values())
+
+    @property
+    def saturated(self):
+        """Whether every window spans its full duration"""
+        return all(window.saturated for window in self.windows.values())
+
+    @property
+    def in_violation(self):
+        """Whether a violation is currently open"""
+        return self.violation_start is not None
+
+    def subscribe(self, callback):
+        """Call callback(ViolationEvent) for every violation start and stop"""
+        self.subscribers.append(callback)
+
+    def emit(self, event):
+        """Deliver an event to all subscribers"""
+        for callback in self.subscribers:
+            callback(event)
+
+    def stability(self, name):
+        """Current positive ratio of one window"""
+        return self.windows[name].ratio()
+
+    def update(self, timestamp, face, eyes, pose, looking, gaze_sample=None):
+        """Add one frame's checks and return the smoothed, hysteretic verdict
+
+        gaze_sample is only given on frames where gaze could be measured
+        (eyes open); the gaze window still ages on the others.
+        """
+        windows = self.windows
+        windows["face"].add(timestamp, face)
+        windows["eye"].add(timestamp, eyes)
+        windows["pose"].add(timestamp, pose)
+        if gaze_sample is None:
+            windows["gaze"].expire(timestamp)
+        else:
+            windows["gaze"].add(timestamp, gaze_sample)
+
+        staying = all(windows[name].ratio() > threshold for name, threshold in self.exit_thresholds.items())
+        entering = bool(looking) and all(
+            windows[name].ratio() > threshold for name, threshold in self.enter_thresholds.items()
+        )
+
+        # Only between the exit and enter cutoffs does the previous verdict matter
+        self.decisive = entering or not staying
+        self.valid = staying if self.valid else entering
+
+        self.observe_attention(timestamp, looking)
+        return self.valid
+
+    def observe_attention(self, timestamp, looking):
+        """Advance the violation state machine with one attention sample"""
+        if self.last_attentive_time is None:
+            # The grace period starts with the first observation
+            self.last_attentive_time = timestamp
+        self.last_timestamp = timestamp
+
+        if looking:
+            self.end_violation(timestamp)
+            self.last_attentive_time = timestamp
+        elif self.violation_start is None and timestamp - self.last_attentive_time > self.alert_threshold:
+            self.violation_start = self.last_attentive_time
+            self.violation_count += 1
+            self.emit(ViolationEvent("start", timestamp, self.last_attentive_time,
+                                     timestamp - self.last_attentive_time))
+
+    def end_violation(self, timestamp):
+        """Close an open violation at timestamp and emit its stop event"""
+        if self.violation_start is None:
+            return
+        started_at, duration = self.violation_start, timestamp - self.violation_start
+        self.violation_seconds += duration
+        self.violation_start = None
+        self.emit(ViolationEvent("stop", timestamp, started_at, duration))
+
+    def time_since_attentive(self, now):
+        """Seconds since the candidate last looked at the camera"""
+        if self.last_attentive_time is None:
+            return 0.0
+        return max(now - self.last_attentive_time, 0.0)
+
+    def reset(self, timestamp=None):
+        """Clear all windows and the violation state
+
+        An open violation is closed first, at timestamp (default: the last
+        observed frame), so subscribers always see its stop event.
+        """
+        if self.violation_start is not None:
+            self.end_violation(self.last_timestamp if timestamp is None else timestamp)
+        for window in self.windows.values():
+            window.clear()
+        self.valid = False
+        self.decisive = False
+        self.last_attentive_time = None
+        self.last_timestamp = None
+        self.violation_start = None
+        self.violation_count = 0
+        self.violation_seconds = 0.0
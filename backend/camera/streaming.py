@@ -0,0 +1,192 @@
+"""
+Result Streaming
+Batched NDJSON verdict stream for the Node backend over stdout, a Unix
+socket or TCP. Consecutive frames with the same verdict are coalesced into
+one record; violation, multiple-faces and quality-change events bypass the
+batch and are written immediately
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+# Verdict fields whose change closes a coalesced run
+STATE_FIELDS = ("is_valid", "face_detected", "eyes_detected", "head_pose_valid", "looking_at_camera")
+
+def open_target(target):
+    """Open a binary writer for '-', 'unix:<path>' or 'tcp:<host>:<port>'"""
+    if target == "-":
+        # Keep the real stdout for records and send every human-readable
+        # print (and C-level stdout noise) to stderr instead
+        sys.stdout.flush()
+        fd = os.dup(1)
+        os.dup2(2, 1)
+        return os.fdopen(fd, "wb")
+
+    if target.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[len("unix:"):])
+    elif target.startswith("tcp:"):
+        host, _, port = target[len("tcp:"):].rpartition(":")
+        sock = socket.create_connection((host or "127.0.0.1", int(port)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    else:
+        raise ValueError(f"Unknown stream target '{target}', use -, unix:<path> or tcp:<host>:<port>")
+    return sock.makefile("wb")
+
+class ResultStreamer:
+    """Coalesces per-frame verdicts into runs and writes them in batches"""
+    def __init__(self, target="-", session_id=None, flush_interval=0.25, max_batch=64):
+        self.target = target
+        self.session_id = session_id
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self.stream = None
+        self.batch = []
+        self.run = None
+        self.last_flush = time.perf_counter()
+        self.failed = False
+
+        # Statistics
+        self.frames_published = 0
+        self.records_written = 0
+        self.events_written = 0
+        self.batches_written = 0
+        self.bytes_written = 0
+        self.records_dropped = 0
+
+    def connect(self):
+        """Open the output channel"""
+        self.stream = open_target(self.target)
+        return self
+
+    def attach(self, stream):
+        """Write to an already-open binary writer (e.g. an accepted socket)"""
+        self.stream = stream
+        return self
+
+    def publish(self, frame_id, timestamp, result):
+        """Add one frame's DetectionResult to the current run"""
+        self.frames_published += 1
+        state = tuple(getattr(result, field) for field in STATE_FIELDS)
+
+        if self.run is not None and self.run["state"] != state:
+            self.close_run()
+        if self.run is None:
+            self.run = {"state": state, "first_frame": frame_id, "start": timestamp, "frames": 0}
+
+        run = self.run
+        run["end"] = timestamp
+        run["last_frame"] = frame_id
+        run["frames"] += 1
+        run["result"] = result
+
+        if (len(self.batch) >= self.max_batch or
+                time.perf_counter() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def close_run(self):
+        """Turn the open run into a batched record"""
+        run, self.run = self.run, None
+        if run is None or not run["frames"]:
+            return
+
+        result = run["result"]
+        record = {"type": "state"}
+        if self.session_id:
+            record["session"] = self.session_id
+        record.update({
+            "start": round(run["start"], 3),
+            "end": round(run["end"], 3),
+            "first_frame": run["first_frame"],
+            "last_frame": run["last_frame"],
+            "frames": run["frames"]
+        })
+        record.update(zip(STATE_FIELDS, run["state"]))
+
+        # Latest measurements of the run, rounded to keep records small
+        for field in ("avg_ear", "pitch", "yaw", "roll",
+                      "face_stability", "eye_stability", "pose_stability", "gaze_stability"):
+            value = getattr(result, field)
+            record[field] = None if value is None else round(value, 3)
+        if result.blendshapes:
+            record["blendshapes"] = result.blendshapes
+        self.batch.append(record)
+
+    def event(self, event):
+        """Write a ViolationEvent right away (after any batched records)"""
+        record = {"type": "violation"}
+        if self.session_id:
+            record["session"] = self.session_id
+        record.update({key: round(value, 3) if isinstance(value, float) else value
+                       for key, value in event.to_dict().items()})
+        self.events_written += 1
+        self.write_now(record)
+
+    def quality(self, change):
+        """Write an adaptive QualityChange right away"""
+        record = {"type": "quality"}
+        if self.session_id:
+            record["session"] = self.session_id
+        record.update(change.to_dict())
+        record["timestamp"] = round(record["timestamp"], 3)
+        self.write_now(record)
+
+    def multiple_faces(self, event):
+        """Write a MultipleFacesEvent right away"""
+        record = {"type": "multiple_faces"}
+        if self.session_id:
+            record["session"] = self.session_id
+        record.update(event.to_dict())
+        record["timestamp"] = round(record["timestamp"], 3)
+        self.events_written += 1
+        self.write_now(record)
+
+    def write_now(self, record):
+        """Flush batched records and then this one, preserving their order"""
+        self.close_run()
+        self.batch.append(record)
+        self.flush()
+
+    def flush(self):
+        """Write all batched records in a single call"""
+        self.last_flush = time.perf_counter()
+
+        # An open run is emitted as-is; the next frame starts a new one
+        self.close_run()
+
+        if not self.batch:
+            return
+        records, self.batch = self.batch, []
+        if self.failed or self.stream is None:
+            self.records_dropped += len(records)
+            return
+
+        payload = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+        try:
+            # One flush per batch: the buffered writer issues a single send
+            self.stream.write(payload)
+            self.stream.flush()
+        except OSError as e:
+            # The consumer went away; keep detecting, stop streaming
+            self.failed = True
+            self.records_dropped += len(records)
+            print(f"\n⚠ Result stream to {self.target} closed: {e}", file=sys.stderr)
+            return
+        self.records_written += len(records)
+        self.batches_written += 1
+        self.bytes_written += len(payload)
+
+    def close(self):
+        """Flush the open run and close the channel"""
+        self.close_run()
+        self.flush()
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+            self.stream = None
@@ -0,0 +1,33 @@
+"""
+Synthetic Faces
+Procedurally drawn faces that Face Mesh reliably detects, used to warm the
+models up at startup and to build the benchmark corpus
+"""
+
+import cv2
+import numpy as np
+
+def draw_face(width, height, dx=0.0, dy=0.0, gaze=0.0, blink=False, tilt=0.0):
+    """Draw a simple synthetic face that Face Mesh reliably detects"""
+    image = np.full((height, width, 3), (90, 110, 130), dtype=np.uint8)
+    scale = height / 480
+    cx, cy = int(width / 2 + dx * scale), int(height / 2 + dy * scale)
+
+    def s(value):
+        return int(value * scale)
+
+    cv2.ellipse(image, (cx, cy + s(10)), (s(95), s(125)), tilt, 0, 360, (140, 170, 210), -1)   # Skin
+    cv2.ellipse(image, (cx, cy - s(105)), (s(100), s(50)), tilt, 180, 360, (40, 40, 60), -1)   # Hair
+    for ex in (-40, 40):
+        eye = (cx + s(ex), cy - s(25))
+        if blink:
+            cv2.line(image, (eye[0] - s(22), eye[1]), (eye[0] + s(22), eye[1]), (50, 50, 70), 2)
+        else:
+            cv2.ellipse(image, eye, (s(22), s(11)), 0, 0, 360, (245, 245, 245), -1)
+            cv2.circle(image, (eye[0] + s(gaze), eye[1]), s(9), (60, 40, 30), -1)
+            cv2.circle(image, (eye[0] + s(gaze), eye[1]), s(4), (10, 10, 10), -1)
+        cv2.ellipse(image, (eye[0], eye[1] - s(20)), (s(24), s(5)), 0, 180, 360, (50, 50, 70), -1)
+    nose = np.array([[cx, cy - s(20)], [cx - s(10), cy + s(25)], [cx + s(10), cy + s(25)]], np.int32)
+    cv2.polylines(image, [nose], False, (100, 120, 170), 2)
+    cv2.ellipse(image, (cx, cy + s(60)), (s(32), s(12)), 0, 0, 180, (60, 60, 170), -1)
+    return cv2.GaussianBlur(image, (5, 5), 0)
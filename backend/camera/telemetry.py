@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Session Telemetry Log
+Per-frame measurements and verdicts appended to preallocated, memory-mapped
+column files that grow in chunks. Appending only writes scalars into the
+maps, so memory stays flat over multi-hour exams, and post-exam queries run
+vectorized over whole columns
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Column name -> (dtype, row shape); measurements are NaN when they could not be taken
+MEASUREMENTS = ("left_ear", "right_ear", "left_iris_x", "left_iris_y", "right_iris_x", "right_iris_y",
+                "pitch", "yaw", "roll")
+FLAGS = ("face_detected", "eyes_detected", "head_pose_valid", "looking_at_camera", "is_valid")
+
+META_FILE = "meta.json"
+
+def attention_violations(timestamps, away, alert_threshold=3.0):
+    """(rows, start_times, durations) of every stretch without attention longer than alert_threshold
+
+    away is a (rows, frames) boolean array, so many verdict sequences over
+    the same timeline are handled at once. Like StabilityTracker, a stretch
+    runs from the last attentive frame to the next one (or to the end).
+    """
+    frames = len(timestamps)
+    if not frames:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    padding = np.zeros((len(away), 1), dtype=np.int8)
+    edges = np.diff(np.concatenate((padding, away.view(np.int8), padding), axis=1), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+
+    begin = timestamps[np.maximum(starts - 1, 0)]
+    durations = timestamps[np.minimum(ends, frames - 1)] - begin
+    keep = durations > alert_threshold
+    return rows[keep], begin[keep], durations[keep]
+
+class ColumnStore:
+    """Growable set of memory-mapped column files sharing one row count
+
+    Subclasses list their columns in COLUMNS. Rows are preallocated
+    grow_rows at a time and the files are trimmed to the rows written on
+    close; meta.json keeps the row count and free-form attributes.
+    """
+    COLUMNS = {}
+
+    def __init__(self, path, capacity=30 * 60 * 10, grow_rows=None, sync_interval=5.0, readonly=False,
+                 attributes=None):
+        self.path = path
+        self.readonly = readonly
+        self.attributes = dict(attributes or {})
+
+        # Rows are added grow_rows at a time (default: ten minutes at 30 FPS)
+        self.capacity = capacity
+        self.grow_rows = grow_rows or capacity
+        self.count = 0
+
+        # Maps flush and the row count is persisted at most this often
+        self.sync_interval = sync_interval
+        self.last_sync = 0.0
+
+        self.maps = {}
+        self.columns = {}
+
+        if readonly:
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+            self.count = self.capacity = meta["count"]
+            self.attributes = meta.get("attributes", {})
+        else:
+            os.makedirs(path, exist_ok=True)
+        self.map_columns()
+        if not readonly:
+            self.write_meta()
+
+    @classmethod
+    def load(cls, path):
+        """Open a finished (or still growing) store read-only"""
+        return cls(path, readonly=True)
+
+    def column_path(self, name):
+        """File backing one column"""
+        dtype, _ = self.COLUMNS[name]
+        return os.path.join(self.path, f"{name}.{np.dtype(dtype).str.lstrip('<>|=')}")
+
+    def row_bytes(self, name):
+        """Bytes one row of a column takes"""
+        dtype, shape = self.COLUMNS[name]
+        return np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+
+    def map_columns(self):
+        """(Re)map every column file at the current capacity"""
+        self.maps = {}
+        self.columns = {}
+        for name, (dtype, shape) in self.COLUMNS.items():
+            path = self.column_path(name)
+            if self.readonly:
+                mapped = np.memmap(path, dtype=dtype, mode="r", shape=(self.capacity,) + shape) \
+                    if self.capacity else np.zeros((0,) + shape, dtype=dtype)
+            else:
+                # Extend the file first; a fresh file starts out sparse
+                with open(path, "ab") as f:
+                    f.truncate(self.capacity * self.row_bytes(name))
+                mapped = np.memmap(path, dtype=dtype, mode="r+", shape=(self.capacity,) + shape)
+            self.maps[name] = mapped
+
+            # Plain ndarray views skip memmap's per-item overhead on the hot path
+            self.columns[name] = mapped.view(np.ndarray)
+
+    def reserve(self):
+        """Index of the next row, growing the files when they are full"""
+        if self.count == self.capacity:
+            self.grow()
+        return self.count
+
+    def grow(self):
+        """Add grow_rows rows to every column"""
+        self.sync()
+        self.capacity += self.grow_rows
+        self.map_columns()
+
+    def commit(self, timestamp):
+        """Count the reserved row and sync when due"""
+        self.count += 1
+        if timestamp - self.last_sync >= self.sync_interval:
+            self.sync(timestamp)
+
+    def sync(self, now=None):
+        """Flush the maps and persist the row count"""
+        for mapped in self.maps.values():
+            mapped.flush()
+        self.write_meta()
+        self.last_sync = time.time() if now is None else now
+
+    def write_meta(self):
+        """Atomically rewrite meta.json"""
+        meta = {
+            "version": 1,
+            "count": self.count,
+            "columns": {name: [np.dtype(dtype).str, list(shape)] for name, (dtype, shape) in self.COLUMNS.items()},
+            "attributes": self.attributes
+        }
+        temp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        """Flush and trim the column files to the rows written"""
+        if self.readonly:
+            self.maps = {}
+            self.columns = {}
+            return
+        self.sync()
+        self.maps = {}
+        self.columns = {}
+        for name in self.COLUMNS:
+            with open(self.column_path(name), "r+b") as f:
+                f.truncate(self.count * self.row_bytes(name))
+        self.capacity = self.count
+
+    @property
+    def nbytes(self):
+        """Bytes of the rows written so far"""
+        return sum(self.count * self.row_bytes(name) for name in self.COLUMNS)
+
+    def column(self, name):
+        """The written part of one column"""
+        return self.columns[name][:self.count]
+
+class TelemetryLog(ColumnStore):
+    """Per-frame DetectionResult measurements, one memory-mapped file per column"""
+    COLUMNS = dict([("timestamp", (np.float64, ()))] +
+                   [(name, (np.float32, ())) for name in MEASUREMENTS] +
+                   [(name, (np.uint8, ())) for name in FLAGS])
+
+    def append(self, timestamp, result):
+        """Append one frame's DetectionResult"""
+        index = self.reserve()
+        columns = self.columns
+        columns["timestamp"][index] = timestamp
+        for name in MEASUREMENTS:
+            value = getattr(result, name)
+            columns[name][index] = np.nan if value is None else value
+        for name in FLAGS:
+            columns[name][index] = getattr(result, name)
+        self.commit(timestamp)
+
+    # Queries: whole-column NumPy operations, no per-frame Python
+
+    def frame_durations(self, max_gap=1.0):
+        """Seconds each frame stands for; longer gaps (pauses) count as max_gap"""
+        timestamps = self.column("timestamp")
+        if len(timestamps) < 2:
+            return np.zeros(len(timestamps))
+        durations = np.empty(len(timestamps))
+        durations[:-1] = np.diff(timestamps)
+        durations[-1] = np.median(durations[:-1])
+        return np.clip(durations, 0.0, max_gap)
+
+    def time_looking_away(self, max_gap=1.0):
+        """Total seconds without attention"""
+        away = 1 - self.column("looking_at_camera")
+        return float(np.dot(self.frame_durations(max_gap), away))
+
+    def violations(self, alert_threshold=3.0):
+        """(start_times, durations) of every stretch without attention longer than alert_threshold"""
+        away = self.column("looking_at_camera") == 0
+        _, starts, durations = attention_violations(self.column("timestamp"), away[np.newaxis], alert_threshold)
+        return starts, durations
+
+    def longest_violation(self, alert_threshold=3.0):
+        """(start_time, duration) of the longest violation, or None"""
+        starts, durations = self.violations(alert_threshold)
+        if not len(durations):
+            return None
+        longest = int(np.argmax(durations))
+        return float(starts[longest]), float(durations[longest])
+
+    def validity_histogram(self, bin_seconds=60.0):
+        """(frames, valid_ratio) per bin of bin_seconds from the first frame"""
+        timestamps = self.column("timestamp")
+        if not len(timestamps):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        bins = ((timestamps - timestamps[0]) // bin_seconds).astype(np.int64)
+        frames = np.bincount(bins)
+        valid = np.bincount(bins, weights=self.column("is_valid"))
+        return frames, valid / np.maximum(frames, 1)
+
+    def summary(self, alert_threshold=3.0):
+        """Session aggregates as a plain dict"""
+        timestamps = self.column("timestamp")
+        starts, durations = self.violations(alert_threshold)
+        longest = self.longest_violation(alert_threshold)
+        ear = (self.column("left_ear") + self.column("right_ear")) / 2
+        ear = ear[~np.isnan(ear)]
+        return {
+            "frames": self.count,
+            "duration_s": round(float(timestamps[-1] - timestamps[0]), 3) if self.count else 0.0,
+            "valid_ratio": round(float(self.column("is_valid").mean()), 4) if self.count else 0.0,
+            "face_ratio": round(float(self.column("face_detected").mean()), 4) if self.count else 0.0,
+            "looking_away_s": round(self.time_looking_away(), 3),
+            "violations": int(len(durations)),
+            "violation_s": round(float(durations.sum()), 3),
+            "longest_violation_s": round(longest[1], 3) if longest else 0.0,
+            "longest_violation_start": longest[0] if longest else None,
+            "mean_ear": round(float(ear.mean()), 4) if len(ear) else None
+        }
+
+def main():
+    """Print the report of a recorded session"""
+    parser = argparse.ArgumentParser(description="Query a session telemetry log")
+    parser.add_argument("path", help="telemetry directory written with --telemetry")
+    parser.add_argument("--alert-threshold", type=float, default=3.0,
+                        help="seconds without attention that count as a violation")
+    parser.add_argument("--bin-seconds", type=float, default=60.0, help="validity histogram bin size")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    log = TelemetryLog.load(args.path)
+    report = log.summary(args.alert_threshold)
+    frames, valid_ratio = log.validity_histogram(args.bin_seconds)
+    report["validity_histogram"] = [round(float(ratio), 4) for ratio in valid_ratio]
+    report["histogram_frames"] = frames.tolist()
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 70)
+    print(f"📼 SESSION TELEMETRY: {args.path}")
+    print("=" * 70)
+    print(f"📊 Frames: {report['frames']:,} over {report['duration_s']:.1f} seconds")
+    print(f"✅ Valid: {report['valid_ratio'] * 100:.1f}%  👤 Face present: {report['face_ratio'] * 100:.1f}%")
+    print(f"👀 Looking Away: {report['looking_away_s']:.1f} seconds")
+    print(f"🚨 Violations: {report['violations']:,} ({report['violation_s']:.1f}s), "
+          f"longest {report['longest_violation_s']:.1f}s")
+    print(f"📈 Valid per {args.bin_seconds:g}s: " +
+          " ".join(f"{ratio * 100:.0f}%" for ratio in report["validity_histogram"]))
+    print(f"⚡ Report computed in {elapsed * 1000:.1f} ms")
+    print("=" * 70)
+    log.close()
+
+if __name__ == "__main__":
+    main()
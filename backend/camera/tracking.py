@@ -0,0 +1,130 @@
+"""
+Keyframe Scheduling & Landmark Tracking
+Runs full Face Mesh inference only on keyframes and propagates the eye,
+iris and pose landmarks in between with sparse Lucas-Kanade optical flow
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Outer eye corners, used to measure motion relative to face size
+EYE_CORNER_INDICES = (33, 263)
+
+class KeyframeScheduler:
+    """Decides when to run Face Mesh and tracks landmarks between keyframes"""
+    def __init__(self, max_interval_frames=6, max_interval_seconds=0.5,
+                 motion_threshold=0.08, error_threshold=12.0, min_tracked_ratio=0.9,
+                 tracked_indices=None):
+        # Landmarks followed individually (set by the detector when omitted)
+        self.tracked_indices = tracked_indices
+
+        # Keyframe budget
+        self.max_interval_frames = max_interval_frames
+        self.max_interval_seconds = max_interval_seconds
+
+        # Motion is measured relative to the inter-ocular distance
+        self.motion_threshold = motion_threshold
+        self.error_threshold = error_threshold
+        self.min_tracked_ratio = min_tracked_ratio
+
+        self.lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+
+        # Tracking state
+        self.prev_gray = None
+        self.points = None
+        self.frames_since_keyframe = 0
+        self.keyframe_time = 0.0
+
+        # Metrics
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.forced_by = {"budget": 0, "motion": 0, "error": 0, "lost": 0}
+
+    def reset_statistics(self):
+        """Drop the tracking reference and zero the metrics (e.g. after warm-up)"""
+        self.prev_gray = None
+        self.points = None
+        self.frames_since_keyframe = 0
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.forced_by = dict.fromkeys(self.forced_by, 0)
+
+    @property
+    def keyframe_rate(self):
+        """Fraction of frames that ran full inference"""
+        total = self.keyframes + self.tracked_frames
+        return self.keyframes / total if total else 1.0
+
+    def set_keyframe(self, gray, points):
+        """Store a fresh inference result as the new tracking reference"""
+        self.keyframes += 1
+        self.frames_since_keyframe = 0
+        self.keyframe_time = time.perf_counter()
+
+        if points is None:
+            # Nothing to track until the face is found again
+            self.prev_gray = None
+            self.points = None
+            self.forced_by["lost"] += 1
+            return
+
+        self.prev_gray = gray
+        self.points = points
+
+    def track(self, gray):
+        """Propagate the previous landmarks to this frame
+
+        Returns the tracked (N, 3) landmark array, or None when a fresh
+        inference is required.
+        """
+        if self.points is None or self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            return None
+
+        # Elapsed budget since the last keyframe
+        if (self.frames_since_keyframe + 1 >= self.max_interval_frames or
+                time.perf_counter() - self.keyframe_time >= self.max_interval_seconds):
+            self.forced_by["budget"] += 1
+            return None
+
+        h, w = gray.shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        prev_px = self.points[self.tracked_indices, :2] * scale
+
+        next_px, status, error = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, prev_px.reshape(-1, 1, 2), None, **self.lk_params
+        )
+        status = status.reshape(-1).astype(bool)
+        error = error.reshape(-1)
+
+        # Tracking error: too many lost points or a high residual
+        if status.mean() < self.min_tracked_ratio or np.median(error[status]) > self.error_threshold:
+            self.forced_by["error"] += 1
+            return None
+
+        displacement = next_px.reshape(-1, 2) - prev_px
+
+        # Motion: large head movement invalidates the propagated mesh
+        left_corner, right_corner = EYE_CORNER_INDICES
+        eye_distance = np.linalg.norm((self.points[right_corner, :2] - self.points[left_corner, :2]) * scale)
+        shift = np.median(displacement[status], axis=0)
+        if np.linalg.norm(shift) > self.motion_threshold * max(eye_distance, 1.0):
+            self.forced_by["motion"] += 1
+            return None
+
+        # Tracked points move individually, the rest follow the median shift
+        displacement[~status] = shift
+        points = self.points.copy()
+        points[:, :2] += shift / scale
+        points[self.tracked_indices, :2] = self.points[self.tracked_indices, :2] + displacement / scale
+
+        self.prev_gray = gray
+        self.points = points
+        self.frames_since_keyframe += 1
+        self.tracked_frames += 1
+        return points